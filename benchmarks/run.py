@@ -0,0 +1,309 @@
+"""
+Measures the throughput of the clients against the stand-in server.
+
+The server runs in a separate process, so the CPU time and allocations
+reported are those of the client only. Results are written as JSON::
+
+    $ python -m benchmarks.run --latency 0.001 --output results.json
+    $ python -m benchmarks.run --filter batch --requests 200
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from turtlecoin import TurtleCoind, Walletd, __version__
+from turtlecoin.codec import JSONCodec, OrjsonCodec
+
+from .server import StandIn, StandInServer, block_hash, transaction_hash
+
+# operations of the allocation pass, tracemalloc slows everything down
+ALLOCATION_OPS = 50
+
+
+def _serve(queue, latency, jitter, height, transactions):
+    server = StandInServer(latency=latency, jitter=jitter,
+                           standin=StandIn(height, transactions))
+    queue.put(server.port)
+    server.serve_forever()
+
+
+def start_server(latency, jitter, height, transactions):
+    """
+    Starts the stand-in server in a child process.
+
+    Returns:
+        tuple: the process and the port
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_serve, args=(queue, latency, jitter, height, transactions),
+        daemon=True)
+    process.start()
+    return process, queue.get(timeout=10)
+
+
+def percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+def scenarios(port, codec, height, batch_size, window):
+    """
+    Returns (name, path, requests per operation, setup) tuples, where
+    setup creates a client and returns the operation to measure, called
+    with the operation number.
+    """
+    top = height - 1
+
+    def daemon(**kwargs):
+        return TurtleCoind(port=port, codec=codec, **kwargs)
+
+    def wallet():
+        return Walletd('test', port=port, codec=codec)
+
+    def get_block_count():
+        client = daemon()
+        return lambda i: client.get_block_count()
+
+    def get_info():
+        client = daemon()
+        return lambda i: client.get_info()
+
+    def get_last_block_header():
+        client = daemon()
+        return lambda i: client.get_last_block_header()
+
+    def get_blocks():
+        client = daemon()
+        return lambda i: client.get_blocks(top - 30 * i % top)
+
+    def get_block():
+        client = daemon()
+        return lambda i: client.get_block(block_hash(top - i % top))
+
+    def get_transaction():
+        client = daemon()
+        return lambda i: client.get_transaction(
+            transaction_hash(top - i % top, 1))
+
+    def wallet_get_status():
+        client = wallet()
+        return lambda i: client.get_status()
+
+    def wallet_get_transactions():
+        client = wallet()
+        return lambda i: client.get_transactions(
+            [], block_hash(i * window % (height - window)), window, '')
+
+    def batch_headers():
+        client = daemon(batch_size=batch_size)
+
+        def op(i):
+            start = i * batch_size % (height - batch_size)
+            client.batch([('getblockheaderbyheight', {'height': h})
+                          for h in range(start, start + batch_size)])
+        return op
+
+    def batch_blocks():
+        client = daemon(batch_size=batch_size)
+
+        def op(i):
+            start = i * batch_size % (height - batch_size)
+            client.batch([('f_block_json', {'hash': block_hash(h)})
+                          for h in range(start, start + batch_size)])
+        return op
+
+    def iter_blocks():
+        client = daemon()
+
+        def op(i):
+            start = i * 300 % (height - 300)
+            for _ in client.iter_blocks(start, start + 300):
+                pass
+        return op
+
+    return [
+        ('get_block_count', 'sync', 1, get_block_count),
+        ('get_info', 'sync', 1, get_info),
+        ('get_last_block_header', 'sync', 1, get_last_block_header),
+        ('get_blocks', 'sync', 1, get_blocks),
+        ('get_block', 'sync', 1, get_block),
+        ('get_transaction', 'sync', 1, get_transaction),
+        ('walletd.get_status', 'sync', 1, wallet_get_status),
+        ('walletd.get_transactions', 'sync', 1, wallet_get_transactions),
+        ('batch.get_block_header_by_height', 'batch', batch_size,
+         batch_headers),
+        ('batch.get_block', 'batch', batch_size, batch_blocks),
+        ('iter_blocks', 'batch', 10, iter_blocks),
+        ('concurrent.get_block', 'concurrent', 1, get_block),
+        ('concurrent.get_transaction', 'concurrent', 1, get_transaction),
+        ('concurrent.walletd.get_transactions', 'concurrent', 1,
+         wallet_get_transactions),
+    ]
+
+
+def _timed(op, i, latencies):
+    started = time.perf_counter()
+    op(i)
+    latencies.append(time.perf_counter() - started)
+
+
+def measure(op, path, ops, concurrency):
+    """
+    Runs `op` `ops` times and returns the timings.
+    """
+    for i in range(min(5, ops)):
+        op(i)
+
+    latencies = []
+    collections = sum(s['collections'] for s in gc.get_stats())
+    cpu = time.process_time()
+    started = time.perf_counter()
+    errors = 0
+    if path == 'concurrent':
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(_timed, op, i, latencies)
+                       for i in range(ops)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                if not errors:
+                    print(f'first error: {e!r}', file=sys.stderr)
+                errors += 1
+    else:
+        for i in range(ops):
+            _timed(op, i, latencies)
+    seconds = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+    collections = sum(s['collections'] for s in gc.get_stats()) - collections
+
+    latencies.sort()
+    return {
+        'ops': ops,
+        'errors': errors,
+        'seconds': seconds,
+        # only completed operations count
+        'ops_per_sec': (ops - errors) / seconds,
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) * 1000,
+            'p50': percentile(latencies, 50) * 1000,
+            'p90': percentile(latencies, 90) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+            'max': latencies[-1] * 1000,
+        } if latencies else None,
+        'cpu_seconds': cpu,
+        'cpu_us_per_op': cpu / ops * 1e6,
+        'gc_collections': collections,
+    }
+
+
+def measure_allocations(op, ops):
+    """
+    Runs `op` under tracemalloc and returns the peak and retained memory.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for i in range(ops):
+            op(i)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    return {
+        'ops': ops,
+        'peak_kib': peak / 1024,
+        'retained_blocks_per_op': sum(d.count_diff for d in diff) / ops,
+        'retained_bytes_per_op': sum(d.size_diff for d in diff) / ops,
+    }
+
+
+def run(args):
+    codec = OrjsonCodec() if args.codec == 'orjson' else JSONCodec()
+    process, port = start_server(args.latency, args.jitter, args.height,
+                                 args.transactions)
+    results = []
+    try:
+        for name, path, requests, setup in scenarios(
+                port, codec, args.height, args.batch_size, args.window):
+            if args.filter and not any(f in name for f in args.filter):
+                continue
+            ops = args.requests
+            if path == 'batch':
+                ops = max(1, ops // requests)
+            result = {'name': name, 'path': path,
+                      'calls_per_op': requests}
+            result.update(measure(setup(), path, ops, args.concurrency))
+            result['calls_per_sec'] = result['ops_per_sec'] * requests
+            if not args.no_allocations:
+                result['allocations'] = measure_allocations(
+                    setup(), min(ops, ALLOCATION_OPS))
+            results.append(result)
+            p99 = (result['latency_ms'] or {}).get('p99', float('nan'))
+            print(f'{name:40} {result["ops_per_sec"]:10.1f} ops/s '
+                  f'p99 {p99:8.2f} ms {result["errors"]} errors',
+                  file=sys.stderr)
+    finally:
+        process.terminate()
+
+    return {
+        'meta': {
+            'turtlecoin': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'codec': codec.name,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'concurrency': args.concurrency,
+            'batch_size': args.batch_size,
+            'transactions_per_block': args.transactions,
+            'window': args.window,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=500,
+                        help='calls per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--window', type=int, default=1000,
+                        help='blocks per walletd getTransactions call')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--height', type=int, default=500000)
+    parser.add_argument('--transactions', type=int, default=20,
+                        help='transactions per block')
+    parser.add_argument('--codec', choices=['json', 'orjson'],
+                        default='json')
+    parser.add_argument('--filter', action='append',
+                        help='only run scenarios containing this string')
+    parser.add_argument('--no-allocations', action='store_true',
+                        help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='file to write the JSON to')
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""
+Local stand-in for TurtleCoind and walletd.
+
+Answers the JSON-RPC methods and GET endpoints used by `TurtleCoind` and
+`Walletd` with generated data of realistic size. Blocks, transactions and
+hashes are derived from the height, so the same request always gets the
+same answer. The height is encoded in the first 16 hex digits of block
+hashes, transaction hashes also carry their index in the block.
+
+Run it on its own with::
+
+    $ python -m benchmarks.server --port 11898 --latency 0.002
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENESIS_TIMESTAMP = 1512800692
+
+
+def block_hash(height):
+    digest = hashlib.sha256(b'block%d' % height).hexdigest()
+    return f'{height:016x}{digest[16:]}'
+
+
+def transaction_hash(height, index):
+    digest = hashlib.sha256(b'tx%d-%d' % (height, index)).hexdigest()
+    return f'{height:012x}{index:04x}{digest[16:]}'
+
+
+def height_of(hash):
+    return int(hash[:16], 16)
+
+
+def _key(seed):
+    return hashlib.sha256(seed.encode()).hexdigest()
+
+
+class StandIn:
+    """
+    Generates the responses of a daemon and a wallet.
+
+    Args:
+        height (int): number of blocks in the chain
+        transactions (int): transactions per block besides the coinbase
+        wallet_transactions (int): wallet transactions per block
+        pool_size (int): number of transactions in the mempool
+    """
+
+    def __init__(self, height=500000, transactions=20, wallet_transactions=1,
+                 pool_size=50):
+        self.height = height
+        self.transactions = transactions
+        self.wallet_transactions = wallet_transactions
+        self.pool_size = pool_size
+
+    def header(self, height):
+        return {
+            'block_size': 300 + 2000 * self.transactions,
+            'depth': self.height - 1 - height,
+            'difficulty': 350000000 + height,
+            'hash': block_hash(height),
+            'height': height,
+            'major_version': 4,
+            'minor_version': 0,
+            'nonce': height * 7919 % 2 ** 32,
+            'num_txes': self.transactions + 1,
+            'orphan_status': False,
+            'prev_hash': block_hash(height - 1) if height else '0' * 64,
+            'reward': 2936608,
+            'timestamp': GENESIS_TIMESTAMP + 30 * height,
+        }
+
+    def block_summary(self, height):
+        return {
+            'cumul_size': 300 + 2000 * self.transactions,
+            'difficulty': 350000000 + height,
+            'hash': block_hash(height),
+            'height': height,
+            'timestamp': GENESIS_TIMESTAMP + 30 * height,
+            'tx_count': self.transactions + 1,
+        }
+
+    def transaction_summary(self, height, index):
+        if index == 0:
+            return {'amount_out': 2936608, 'fee': 0,
+                    'hash': transaction_hash(height, 0), 'size': 266}
+        return {'amount_out': 1000 * index, 'fee': 10,
+                'hash': transaction_hash(height, index), 'size': 2000}
+
+    def block(self, height):
+        header = self.header(height)
+        return {
+            'alreadyGeneratedCoins': str(1484230931125 + 2936608 * height),
+            'alreadyGeneratedTransactions': 974921 + height,
+            'baseReward': 2935998,
+            'blockSize': header['block_size'],
+            'depth': header['depth'],
+            'difficulty': header['difficulty'],
+            'effectiveSizeMedian': 100000,
+            'hash': header['hash'],
+            'height': height,
+            'major_version': 4,
+            'minor_version': 0,
+            'nonce': header['nonce'],
+            'orphan_status': False,
+            'penalty': 0,
+            'prev_hash': header['prev_hash'],
+            'reward': 2936608 + 10 * self.transactions,
+            'sizeMedian': 231,
+            'timestamp': header['timestamp'],
+            'totalFeeAmount': 10 * self.transactions,
+            'transactions': [self.transaction_summary(height, i)
+                             for i in range(self.transactions + 1)],
+            'transactionsCumulativeSize': 266 + 2000 * self.transactions,
+        }
+
+    def transaction(self, hash):
+        height, index = int(hash[:12], 16), int(hash[12:16], 16)
+        if index == 0:
+            vin = [{'type': 'ff', 'value': {'height': height}}]
+            outputs = 8
+        else:
+            vin = [{'type': '02', 'value': {
+                'amount': 1000 * index,
+                'k_image': _key(f'image{height}-{index}-{i}'),
+                'key_offsets': [height * 3 + j for j in range(4)]}}
+                for i in range(2)]
+            outputs = 4
+        vout = [{'amount': 80 * (j + 1), 'target': {
+            'data': {'key': _key(f'out{height}-{index}-{j}')}, 'type': '02'}}
+            for j in range(outputs)]
+        return {
+            'block': self.block_summary(height),
+            'status': 'OK',
+            'tx': {'extra': '01' + _key(f'extra{height}-{index}'),
+                   'unlock_time': height + 40 if index == 0 else 0,
+                   'version': 1, 'vin': vin, 'vout': vout},
+            'txDetails': dict(self.transaction_summary(height, index),
+                              mixin=0 if index == 0 else 3, paymentId=''),
+        }
+
+    def wallet_transaction(self, height, index):
+        return {
+            'amount': 1000 * (index + 1),
+            'blockIndex': height,
+            'extra': '01' + _key(f'extra{height}-{index}'),
+            'fee': 10,
+            'isBase': False,
+            'paymentId': _key(f'payment{height}-{index}'),
+            'state': 0,
+            'timestamp': GENESIS_TIMESTAMP + 30 * height,
+            'transactionHash': transaction_hash(height, index + 1),
+            'transfers': [{'address': f'TRTL{_key(str(j))}', 'amount': 500,
+                           'type': 0} for j in range(3)],
+            'unlockTime': 0,
+        }
+
+    def wallet_items(self, first, count):
+        last = min(self.height, first + count)
+        return [{'blockHash': block_hash(h), 'transactions': [
+            self.wallet_transaction(h, i)
+            for i in range(self.wallet_transactions)]}
+            for h in range(first, last)]
+
+    def get(self, path):
+        """
+        Returns the body of a GET request, None for unknown paths.
+        """
+        if path == '/getheight':
+            return {'height': self.height, 'network_height': self.height,
+                    'status': 'OK'}
+        if path == '/getinfo':
+            return {
+                'alt_blocks_count': 7, 'difficulty': 350000000,
+                'grey_peerlist_size': 736, 'hashrate': 11666666,
+                'height': self.height, 'incoming_connections_count': 0,
+                'last_known_block_index': self.height - 1,
+                'major_version': 4, 'minor_version': 0,
+                'network_height': self.height,
+                'outgoing_connections_count': 8, 'start_time': 1531374018,
+                'status': 'OK', 'supported_height': 620000, 'synced': True,
+                'testnet': False, 'tx_count': 719763,
+                'tx_pool_size': self.pool_size,
+                'upgrade_heights': [187000, 350000, 440000, 620000],
+                'version': '0.6.4', 'white_peerlist_size': 52}
+        if path == '/gettransactions':
+            return {'missed_tx': [], 'status': 'OK', 'txs_as_hex': []}
+        if path == '/getpeers':
+            return {'peers': [f'10.0.{i}.1:11897' for i in range(8)],
+                    'status': 'OK'}
+        if path == '/feeinfo':
+            return {'address': '', 'amount': 0,
+                    'status': "Node's fee address is not set"}
+        return None
+
+    def call(self, method, params):
+        """
+        Returns the result of a JSON-RPC call.
+
+        Raises:
+            KeyError: if the method is unknown
+        """
+        top = self.height - 1
+        if method == 'getblockcount':
+            return {'count': self.height, 'status': 'OK'}
+        if method == 'on_getblockhash':
+            return block_hash(params[0] - 1)
+        if method == 'getlastblockheader':
+            return {'block_header': self.header(top), 'status': 'OK'}
+        if method == 'getblockheaderbyhash':
+            return {'block_header': self.header(height_of(params['hash'])),
+                    'status': 'OK'}
+        if method == 'getblockheaderbyheight':
+            return {'block_header': self.header(params['height']),
+                    'status': 'OK'}
+        if method == 'getblocktemplate':
+            return {'blocktemplate_blob': '04' * 400,
+                    'difficulty': 350000000, 'height': self.height,
+                    'reserved_offset': 412, 'status': 'OK'}
+        if method == 'submitblock':
+            return {'status': 'OK'}
+        if method == 'getcurrencyid':
+            return {'currency_id_blob': _key('TRTL')}
+        if method == 'f_blocks_list_json':
+            height = min(params['height'], top)
+            return {'blocks': [self.block_summary(h) for h in
+                               range(height, max(-1, height - 30), -1)],
+                    'status': 'OK'}
+        if method == 'f_block_json':
+            return {'block': self.block(height_of(params['hash'])),
+                    'status': 'OK'}
+        if method == 'f_transaction_json':
+            return self.transaction(params['hash'])
+        if method == 'f_on_transactions_pool_json':
+            return {'transactions': [
+                self.transaction_summary(self.height, i + 1)
+                for i in range(self.pool_size)], 'status': 'OK'}
+
+        if method == 'getStatus':
+            return {'blockCount': self.height, 'knownBlockCount': self.height,
+                    'lastBlockHash': block_hash(top), 'peerCount': 8}
+        if method == 'getBalance':
+            return {'availableBalance': 123456789, 'lockedAmount': 1000}
+        if method == 'getAddresses':
+            return {'addresses': [f'TRTL{_key(str(j))}' for j in range(3)]}
+        if method == 'getBlockHashes':
+            first = params['firstBlockIndex']
+            return {'blockHashes': [block_hash(h) for h in range(
+                first, min(self.height, first + params['blockCount']))]}
+        if method == 'getTransactions':
+            if 'blockHash' in params:
+                first = height_of(params['blockHash'])
+            else:
+                first = params['firstBlockIndex']
+            return {'items': self.wallet_items(first, params['blockCount'])}
+        if method == 'getTransactionHashes':
+            first = params.get('firstBlockIndex', 0)
+            return {'items': [
+                {'blockHash': item['blockHash'], 'transactionHashes': [
+                    tx['transactionHash'] for tx in item['transactions']]}
+                for item in self.wallet_items(first, params['blockCount'])]}
+        if method == 'getTransaction':
+            hash = params['transactionHash']
+            height, index = int(hash[:12], 16), int(hash[12:16], 16)
+            return {'transaction': self.wallet_transaction(height, index - 1)}
+        if method == 'getUnconfirmedTransactionHashes':
+            return {'transactionHashes': []}
+        if method == 'sendTransaction':
+            digest = hashlib.sha256(
+                json.dumps(params, sort_keys=True).encode()).hexdigest()
+            return {'transactionHash': digest}
+        if method == 'estimateFusion':
+            return {'fusionReadyCount': 0, 'totalOutputCount': 200}
+        if method == 'getFeeInfo':
+            return {'address': '', 'amount': 0}
+        raise KeyError(method)
+
+    def handle(self, request):
+        try:
+            result = self.call(request.get('method'), request.get('params'))
+        except KeyError:
+            return {'jsonrpc': '2.0', 'id': request.get('id'),
+                    'error': {'code': -32601, 'message': 'Method not found'}}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _wait(self):
+        server = self.server
+        delay = server.latency
+        if server.jitter:
+            delay += random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def _reply(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._wait()
+        body = self.server.standin.get(self.path)
+        if body is None:
+            self._reply({'status': 'Not found'}, 404)
+        else:
+            self._reply(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length))
+        self._wait()
+        standin = self.server.standin
+        if isinstance(request, list):
+            if not self.server.batch:
+                return self._reply({'jsonrpc': '2.0', 'id': None, 'error': {
+                    'code': -32600, 'message': 'Invalid Request'}})
+            return self._reply([standin.handle(r) for r in request])
+        self._reply(standin.handle(request))
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server answering like TurtleCoind and walletd.
+
+    Example::
+
+        server = StandInServer(latency=0.001)
+        server.start()
+        daemon = TurtleCoind(port=server.port)
+        ...
+        server.stop()
+
+    Args:
+        host (str)
+        port (int): 0 picks a free port
+        latency (float): seconds to wait before every answer
+        jitter (float): up to this many seconds are added to the latency
+        batch (bool): whether JSON-RPC batches are accepted
+        standin (StandIn): generates the data
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 batch=True, standin=None):
+        super().__init__((host, port), Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.batch = batch
+        self.standin = standin or StandIn()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11898)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--height', type=int, default=500000)
+    parser.add_argument('--transactions', type=int, default=20)
+    parser.add_argument('--no-batch', dest='batch', action='store_false')
+    args = parser.parse_args()
+
+    standin = StandIn(height=args.height, transactions=args.transactions)
+    server = StandInServer(args.host, args.port, args.latency, args.jitter,
+                           args.batch, standin)
+    print(f'listening on http://{args.host}:{server.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -93,7 +93,7 @@ setup(
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
     url=URL,
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('tests', 'benchmarks')),
     # If your package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
 
@@ -103,6 +103,10 @@ setup(
     install_requires=REQUIRED,
     extras_require={
         'docs': ['sphinx>=1.7', 'sphinx_rtd_theme'],
+        'async': ['aiohttp>=3.0'],
+        'numpy': ['numpy'],
+        'fast': ['orjson'],
+        'parquet': ['pyarrow'],
     },
     include_package_data=True,
     license='MIT',
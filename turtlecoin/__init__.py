@@ -1,5 +1,8 @@
 from .walletd import Walletd  # noqa
 from .turtlecoind import TurtleCoind  # noqa
+from .client import create_session  # noqa
+from .transport import SocketSession  # noqa
+from .aio import AsyncWalletd, AsyncTurtleCoind  # noqa
 from .__version__ import __version__  # noqa
 
 import logging
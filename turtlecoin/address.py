@@ -0,0 +1,344 @@
+"""
+Offline TurtleCoin address encoding.
+
+Addresses are CryptoNote base58 encoded: the varint address prefix, the
+public spend and view keys and the first 4 bytes of the Keccak-256 hash
+of both as checksum. Integrated addresses put the 64 character payment ID
+in front of the keys. All functions work without walletd and produce the
+same strings as `Walletd.create_integrated_address`::
+
+    from turtlecoin.address import create_integrated_address, decode_address
+
+    create_integrated_address(address, payment_id)
+    decode_address(address).spend_key
+
+Keccak is computed in Python, or with `pycryptodome` if it is installed.
+"""
+
+from collections import namedtuple
+
+try:
+    from Crypto.Hash import keccak as _keccak
+except ImportError:
+    _keccak = None
+
+# CRYPTONOTE_PUBLIC_ADDRESS_BASE58_PREFIX of TurtleCoin
+PREFIX = 3914525
+ADDRESS_LENGTH = 99
+INTEGRATED_ADDRESS_LENGTH = 187
+
+ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_INDEX = {c: i for i, c in enumerate(ALPHABET)}
+# number of characters for an encoded block of 0 to 8 bytes
+_ENCODED_SIZES = (0, 2, 3, 5, 6, 7, 9, 10, 11)
+_DECODED_SIZES = {size: i for i, size in enumerate(_ENCODED_SIZES)}
+
+KEY_SIZE = 32
+CHECKSUM_SIZE = 4
+PAYMENT_ID_SIZE = 64
+
+Address = namedtuple('Address', ['prefix', 'spend_key', 'view_key',
+                                 'payment_id'])
+Address.__doc__ = """
+A decoded address.
+
+Attributes:
+    prefix (int): the address prefix
+    spend_key (str): public spend key as hex
+    view_key (str): public view key as hex
+    payment_id (str): payment ID of an integrated address, otherwise None
+"""
+
+
+# Keccak-f[1600], lanes are indexed x + 5 * y
+
+_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A,
+    0x8000000080008000, 0x000000000000808B, 0x0000000080000001,
+    0x8000000080008081, 0x8000000000008009, 0x000000000000008A,
+    0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089,
+    0x8000000000008003, 0x8000000000008002, 0x8000000000000080,
+    0x000000000000800A, 0x800000008000000A, 0x8000000080008081,
+    0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+_ROTATIONS = (
+    (0, 36, 3, 41, 18), (1, 44, 10, 45, 2), (62, 6, 43, 15, 61),
+    (28, 55, 25, 21, 56), (27, 20, 39, 8, 14),
+)
+# (source lane, destination lane, rotation) of the rho and pi steps
+_RHO_PI = tuple((x + 5 * y, y + 5 * ((2 * x + 3 * y) % 5), _ROTATIONS[x][y])
+                for x in range(5) for y in range(5))
+_MASK = (1 << 64) - 1
+_RATE = 136
+
+
+def _keccak_f(a):
+    b = [0] * 25
+    for rc in _ROUND_CONSTANTS:
+        c = [a[x] ^ a[x + 5] ^ a[x + 10] ^ a[x + 15] ^ a[x + 20]
+             for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) |
+                                (c[(x + 1) % 5] >> 63)) & _MASK)
+             for x in range(5)]
+        for source, destination, r in _RHO_PI:
+            lane = a[source] ^ d[source % 5]
+            b[destination] = ((lane << r) | (lane >> (64 - r))) & _MASK \
+                if r else lane
+        for y in range(0, 25, 5):
+            b0, b1, b2, b3, b4 = b[y:y + 5]
+            a[y] = b0 ^ (~b1 & b2)
+            a[y + 1] = b1 ^ (~b2 & b3)
+            a[y + 2] = b2 ^ (~b3 & b4)
+            a[y + 3] = b3 ^ (~b4 & b0)
+            a[y + 4] = b4 ^ (~b0 & b1)
+        a[0] ^= rc
+
+
+def keccak_256(data):
+    """
+    Returns the Keccak-256 digest of `data` as used by CryptoNote (the
+    original Keccak padding, not SHA3-256).
+    """
+    if _keccak is not None:
+        return _keccak.new(data=data, digest_bits=256).digest()
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(bytes(-len(padded) % _RATE))
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset:offset + _RATE]
+        for i in range(_RATE // 8):
+            state[i] ^= int.from_bytes(block[8 * i:8 * i + 8], 'little')
+        _keccak_f(state)
+    return b''.join(lane.to_bytes(8, 'little') for lane in state[:4])
+
+
+def b58encode(data):
+    """
+    Encodes bytes with the CryptoNote base58 variant, which encodes
+    blocks of 8 bytes to 11 characters.
+    """
+    chars = []
+    for offset in range(0, len(data), 8):
+        block = data[offset:offset + 8]
+        number = int.from_bytes(block, 'big')
+        encoded = []
+        for _ in range(_ENCODED_SIZES[len(block)]):
+            number, digit = divmod(number, 58)
+            encoded.append(ALPHABET[digit])
+        chars.extend(reversed(encoded))
+    return ''.join(chars)
+
+
+def b58decode(string):
+    """
+    Decodes a CryptoNote base58 string.
+
+    Raises:
+        ValueError: if `string` is not valid base58
+    """
+    data = bytearray()
+    for offset in range(0, len(string), 11):
+        block = string[offset:offset + 11]
+        size = _DECODED_SIZES.get(len(block))
+        if not size:
+            raise ValueError('invalid base58 length')
+        number = 0
+        for char in block:
+            try:
+                number = number * 58 + _INDEX[char]
+            except KeyError:
+                raise ValueError(f'invalid base58 character {char!r}')
+        if number >> (8 * size):
+            raise ValueError('invalid base58 block')
+        data += number.to_bytes(size, 'big')
+    return bytes(data)
+
+
+def _encode_varint(number):
+    data = bytearray()
+    while number >= 0x80:
+        data.append(number & 0x7f | 0x80)
+        number >>= 7
+    data.append(number)
+    return bytes(data)
+
+
+def _decode_varint(data):
+    number = shift = 0
+    for i, byte in enumerate(data):
+        number |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return number, i + 1
+        shift += 7
+    raise ValueError('invalid address prefix')
+
+
+# ed25519 field prime and curve constant, used to check public keys
+_P = 2 ** 255 - 19
+_D = -121665 * pow(121666, _P - 2, _P) % _P
+_SQRT_M1 = pow(2, (_P - 1) // 4, _P)
+
+
+def is_valid_key(key):
+    """
+    Returns True if the 32 bytes `key` is a point on the ed25519 curve,
+    the check walletd does for the keys of an address.
+    """
+    y = int.from_bytes(key, 'little')
+    sign = y >> 255
+    y = (y & ((1 << 255) - 1)) % _P
+    u = (y * y - 1) % _P
+    v = (_D * y * y + 1) % _P
+    x = u * pow(v, 3, _P) * pow(u * pow(v, 7, _P), (_P - 5) // 8, _P) % _P
+    if (v * x * x - u) % _P:
+        x = x * _SQRT_M1 % _P
+        if (v * x * x - u) % _P:
+            return False
+    return bool(x) or not sign
+
+
+def encode_address(spend_key, view_key, payment_id=None, prefix=PREFIX):
+    """
+    Builds an address from its public keys.
+
+    Args:
+        spend_key (str): public spend key as hex
+        view_key (str): public view key as hex
+        payment_id (str): (optional) 64 hex characters, builds an
+            integrated address
+        prefix (int): address prefix
+
+    Returns:
+        str
+    """
+    keys = bytes.fromhex(spend_key) + bytes.fromhex(view_key)
+    if len(keys) != 2 * KEY_SIZE:
+        raise ValueError('keys must be 32 bytes')
+    if payment_id is not None:
+        _check_payment_id(payment_id)
+        keys = payment_id.encode('ascii') + keys
+    data = _encode_varint(prefix) + keys
+    return b58encode(data + keccak_256(data)[:CHECKSUM_SIZE])
+
+
+def decode_address(address, prefix=PREFIX):
+    """
+    Splits an address or integrated address into its parts and checks
+    its prefix, length, checksum and keys.
+
+    Args:
+        address (str)
+        prefix (int): expected address prefix
+
+    Returns:
+        Address
+
+    Raises:
+        ValueError: if the address is invalid, with the reason
+    """
+    data = b58decode(address)
+    if len(data) <= CHECKSUM_SIZE:
+        raise ValueError('invalid address length')
+    data, checksum = data[:-CHECKSUM_SIZE], data[-CHECKSUM_SIZE:]
+    if keccak_256(data)[:CHECKSUM_SIZE] != checksum:
+        raise ValueError('invalid address checksum')
+    tag, size = _decode_varint(data)
+    if tag != prefix:
+        raise ValueError(f'invalid address prefix {tag}')
+    data = data[size:]
+
+    payment_id = None
+    if len(data) == PAYMENT_ID_SIZE + 2 * KEY_SIZE:
+        payment_id = data[:PAYMENT_ID_SIZE].decode('ascii', 'replace')
+        _check_payment_id(payment_id)
+        data = data[PAYMENT_ID_SIZE:]
+    elif len(data) != 2 * KEY_SIZE:
+        raise ValueError('invalid address length')
+    spend_key, view_key = data[:KEY_SIZE], data[KEY_SIZE:]
+    if not is_valid_key(spend_key) or not is_valid_key(view_key):
+        raise ValueError('invalid address key')
+    return Address(tag, spend_key.hex(), view_key.hex(), payment_id)
+
+
+def validate_address(address, prefix=PREFIX, integrated=None):
+    """
+    Returns True if `address` is valid.
+
+    Args:
+        address (str)
+        prefix (int): expected address prefix
+        integrated (bool): (optional) True to only accept integrated
+            addresses, False to only accept standard addresses
+    """
+    try:
+        decoded = decode_address(address, prefix)
+    except ValueError:
+        return False
+    return integrated is None or integrated == (decoded.payment_id is not None)
+
+
+def create_integrated_address(address, payment_id, prefix=PREFIX):
+    """
+    Builds the integrated address of a standard address and a payment ID,
+    like `Walletd.create_integrated_address`.
+
+    Args:
+        address (str): standard address
+        payment_id (str): 64 hex characters
+
+    Returns:
+        str
+    """
+    decoded = decode_address(address, prefix)
+    if decoded.payment_id is not None:
+        raise ValueError('address is already an integrated address')
+    return encode_address(decoded.spend_key, decoded.view_key, payment_id,
+                          prefix)
+
+
+def validate_addresses(addresses, prefix=PREFIX, integrated=None):
+    """
+    Validates many addresses, see `validate_address`.
+
+    Returns:
+        list: a bool per address
+    """
+    return [validate_address(a, prefix, integrated) for a in addresses]
+
+
+def create_integrated_addresses(pairs, prefix=PREFIX):
+    """
+    Builds many integrated addresses, see `create_integrated_address`.
+
+    Every distinct address is only decoded once.
+
+    Args:
+        pairs (list): (address, payment_id) tuples
+
+    Returns:
+        list: an integrated address per pair
+    """
+    decoded = {}
+    integrated = []
+    for address, payment_id in pairs:
+        keys = decoded.get(address)
+        if keys is None:
+            parts = decode_address(address, prefix)
+            if parts.payment_id is not None:
+                raise ValueError('address is already an integrated address')
+            keys = decoded[address] = parts
+        integrated.append(encode_address(keys.spend_key, keys.view_key,
+                                         payment_id, prefix))
+    return integrated
+
+
+def _check_payment_id(payment_id):
+    if len(payment_id) != PAYMENT_ID_SIZE:
+        raise ValueError('payment ID must be 64 hex characters')
+    try:
+        bytes.fromhex(payment_id)
+    except ValueError:
+        raise ValueError('payment ID must be 64 hex characters')
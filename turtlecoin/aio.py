@@ -0,0 +1,248 @@
+"""
+asyncio versions of the `Walletd` and `TurtleCoind` clients.
+
+Requires `aiohttp`::
+
+    $ pip install turtlecoin[async]
+
+Every RPC method of the synchronous clients is available and returns a
+coroutine, including `TurtleCoind.batch`::
+
+    async with AsyncTurtleCoind() as daemon:
+        headers = await asyncio.gather(*[
+            daemon.get_block_header_by_height(h) for h in range(1000)])
+
+`AsyncTurtleCoind.iter_blocks` is an asynchronous generator::
+
+    async for block in daemon.iter_blocks(start=1000000):
+        ...
+"""
+import asyncio
+import time
+from collections import deque
+
+from .client import _error_code, _method_name
+from .instrumentation import CallInfo
+from .turtlecoind import (BLOCKS_PER_REQUEST, TurtleCoind, _batch_payload,
+                          _batch_results)
+from .turtlecoind import _transaction_block_index as _block_index
+from .walletd import Walletd
+from .walletd import _transaction_block_index as _wallet_block_index
+
+
+class AsyncClientMixin:
+    """
+    Replaces the blocking transport of a client with an `aiohttp` session.
+
+    The session is created lazily on the first request so that it is bound
+    to the running event loop.
+    """
+
+    def _create_session(self):
+        return None
+
+    def _get_session(self):
+        if self.session is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the connection pool if it was created by this client.
+        Shared sessions passed in by the caller are left open.
+        """
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _post(self, url, payload):
+        response = await self._send(url, payload)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    async def _send(self, url, payload):
+        data = self._encode(payload)
+        session = self._get_session()
+        return await self._request(
+            _method_name(payload), url, len(data),
+            lambda: session.post(url, data=data, headers=self.headers))
+
+    async def _get(self, url):
+        session = self._get_session()
+        return await self._request(url.rsplit('/', 1)[-1], url, 0,
+                                   lambda: session.get(url))
+
+    async def _request(self, method, url, request_bytes, request):
+        if not self._hooks:
+            async with request() as resp:
+                return self.codec.decode(await resp.read())
+
+        self._call_pre_hooks(method, url)
+        started = time.perf_counter()
+        status = response_bytes = error = None
+        try:
+            async with request() as resp:
+                status = resp.status
+                body = await resp.read()
+            response_bytes = len(body)
+            response = self.codec.decode(body)
+            error = _error_code(response)
+            return response
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._call_post_hooks(CallInfo(
+                method, url, time.perf_counter() - started, request_bytes,
+                response_bytes, status, error))
+
+
+class AsyncTurtleCoind(AsyncClientMixin, TurtleCoind):
+    """
+    Non-blocking client for the JSON-RPC interface of `TurtleCoind`.
+
+    Args:
+        session (aiohttp.ClientSession): (optional) shared session
+        limit (int): maximum number of simultaneous connections
+        limit_per_host (int): maximum connections per host, 0 for no limit
+        keepalive_timeout (float): seconds to keep idle connections open
+    """
+
+    def __init__(self, host='127.0.0.1', port=11898, session=None,
+                 limit=100, limit_per_host=0, keepalive_timeout=15):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        super().__init__(host, port, session=session)
+
+    async def batch(self, calls, batch_size=None):
+        batch_size = batch_size or self.batch_size
+        results = []
+        for i in range(0, len(calls), batch_size):
+            chunk = calls[i:i + batch_size]
+            if self.batch_supported:
+                responses = await self._send_batch(chunk)
+                if responses is not None:
+                    results.extend(responses)
+                    continue
+                self.batch_supported = False
+            results.extend(await self._send_concurrently(chunk))
+        return results
+
+    async def _send_batch(self, calls):
+        try:
+            response = await self._send(self.url + '/json_rpc',
+                                        _batch_payload(calls))
+        except ValueError:
+            return None
+        return _batch_results(calls, response)
+
+    async def _send_concurrently(self, calls):
+        async def call(method, params):
+            try:
+                return await self._make_request(method, **(params or {}))
+            except ValueError as e:
+                return e
+
+        return await asyncio.gather(*[call(method, params)
+                                      for method, params in calls])
+
+    async def iter_blocks(self, start=0, end=None, workers=4, prefetch=8):
+        """
+        Asynchronous generator version of `TurtleCoind.iter_blocks`.
+        """
+        if end is None:
+            end = (await self.get_block_count())['result']['count'] - 1
+        tops = iter(range(min(start + BLOCKS_PER_REQUEST - 1, end),
+                          end + BLOCKS_PER_REQUEST,
+                          BLOCKS_PER_REQUEST))
+        next_height = start
+        semaphore = asyncio.Semaphore(workers)
+        pending = deque()
+
+        async def get_blocks(height):
+            async with semaphore:
+                return await self.get_blocks(height)
+
+        def fetch_next():
+            top = next(tops, None)
+            if top is not None:
+                pending.append(
+                    asyncio.ensure_future(get_blocks(min(top, end))))
+
+        try:
+            for _ in range(max(prefetch, 1)):
+                fetch_next()
+            while pending:
+                blocks = (await pending.popleft())['result']['blocks']
+                fetch_next()
+                for block in sorted(blocks, key=lambda b: b['height']):
+                    if next_height <= block['height'] <= end:
+                        # windows can overlap at the end of the range
+                        next_height = block['height'] + 1
+                        yield block
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_transactions_bulk(self, hashes, workers=8):
+        async def block_count():
+            return (await self.get_block_count())['result']['count']
+
+        return await self.transaction_cache.bulk_async(
+            hashes, self.get_transaction,
+            _block_index, block_count, workers)
+
+
+class AsyncWalletd(AsyncClientMixin, Walletd):
+    """
+    Non-blocking client for the Walletd RPC interface.
+
+    Args:
+        session (aiohttp.ClientSession): (optional) shared session
+        limit (int): maximum number of simultaneous connections
+        limit_per_host (int): maximum connections per host, 0 for no limit
+        keepalive_timeout (float): seconds to keep idle connections open
+    """
+
+    def __init__(self, password, host='127.0.0.1', port=8070, session=None,
+                 limit=100, limit_per_host=0, keepalive_timeout=15):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        super().__init__(password, host, port, session=session)
+
+    async def get_transactions_bulk(self, hashes, workers=8):
+        async def block_count():
+            return (await self.get_status())['result']['blockCount']
+
+        return await self.transaction_cache.bulk_async(
+            hashes, self.get_transaction, _wallet_block_index,
+            block_count, workers)
+
+    async def delete_address(self, address):
+        params = {'address': address}
+        await self._make_request('deleteAddress', **params)
+        return True
+
+    async def send_delayed_transaction(self, transaction_hash):
+        params = {'transactionHash': transaction_hash}
+        await self._make_request('sendDelayedTransaction', **params)
+        return True
+
+    async def delete_delayed_transaction(self, transaction_hash):
+        params = {'transactionHash': transaction_hash}
+        await self._make_request('deleteDelayedTransaction', **params)
+        return True
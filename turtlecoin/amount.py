@@ -0,0 +1,241 @@
+"""
+Exact amounts.
+
+Wallets and daemons use integer atomic units, 100 atomic units are
+1 TRTL. `Amount` is an `int` of atomic units that parses and formats
+TRTL values without going through floats::
+
+    Amount.parse('0.29')
+    Amount(29)
+    str(Amount(123456))
+    '1234.56'
+
+The bulk functions take lists or `numpy` int64 arrays::
+
+    atomic = parse_amounts(['10.00', '0.29', '-5.5'], array=True)
+    sum_amounts(atomic)
+    format_amounts(atomic)
+"""
+
+import operator
+from decimal import Decimal, InvalidOperation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DECIMALS = 2
+UNIT = 10 ** DECIMALS
+
+# amounts have to fit into a signed 64 bit integer
+MIN_AMOUNT = -2 ** 63
+MAX_AMOUNT = 2 ** 63 - 1
+
+
+def _check_range(atomic):
+    if not MIN_AMOUNT <= atomic <= MAX_AMOUNT:
+        raise OverflowError(f'amount {atomic} does not fit into 64 bits')
+    return atomic
+
+
+def _parse(value):
+    if isinstance(value, str):
+        return _parse_string(value)
+    if isinstance(value, float):
+        # floats cannot hold cents exactly, round to the nearest unit
+        return _parse_decimal(Decimal(repr(value)), rounded=True)
+    if isinstance(value, Decimal):
+        return _parse_decimal(value)
+    return _check_range(operator.index(value) * UNIT)
+
+
+def _parse_string(value):
+    text = value.strip()
+    sign = 1
+    if text[:1] in ('-', '+'):
+        sign = -1 if text[0] == '-' else 1
+        text = text[1:]
+    whole, _, fraction = text.partition('.')
+    if (not whole and not fraction) or (whole and not whole.isdigit()) or \
+            (fraction and not fraction.isdigit()):
+        raise ValueError(f'invalid amount {value!r}')
+    if len(fraction) > DECIMALS:
+        if fraction[DECIMALS:].strip('0'):
+            raise ValueError(f'{value!r} has more than {DECIMALS} decimals')
+        fraction = fraction[:DECIMALS]
+    atomic = int(whole or 0) * UNIT + int(fraction.ljust(DECIMALS, '0'))
+    return _check_range(sign * atomic)
+
+
+def _parse_decimal(value, rounded=False):
+    if not value.is_finite():
+        raise ValueError(f'invalid amount {value!r}')
+    try:
+        scaled = value.scaleb(DECIMALS)
+        atomic = scaled.to_integral_value()
+    except InvalidOperation:
+        raise ValueError(f'invalid amount {value!r}')
+    if not rounded and scaled != atomic:
+        raise ValueError(f'{value} has more than {DECIMALS} decimals')
+    return _check_range(int(atomic))
+
+
+def _format(atomic):
+    whole, fraction = divmod(abs(atomic), UNIT)
+    sign = '-' if atomic < 0 else ''
+    return f'{sign}{whole}.{fraction:0{DECIMALS}d}'
+
+
+class Amount(int):
+    """
+    An amount in atomic units.
+
+    Sums and differences of amounts are amounts again and are checked to
+    fit into 64 bits, other operations return plain ints.
+
+    Args:
+        atomic (int): number of atomic units
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, atomic=0):
+        return super().__new__(cls, _check_range(operator.index(atomic)))
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Creates an amount from a TRTL value.
+
+        Args:
+            value (str, Decimal, int or float): e.g. '10.25' or
+                Decimal('10.25'). Strings and Decimals with more than two
+                decimals raise a `ValueError`, as do strings with digit
+                separators like '1,000' or '1_000'. Floats are rounded to
+                the nearest atomic unit.
+        """
+        return cls(_parse(value))
+
+    @property
+    def decimal(self):
+        """
+        The amount in TRTL as `Decimal`.
+        """
+        return Decimal(int(self)).scaleb(-DECIMALS)
+
+    def __str__(self):
+        return _format(int(self))
+
+    def __repr__(self):
+        return f'Amount({int(self)})'
+
+    def __add__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Amount(int(self) + other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Amount(int(self) - other)
+
+    def __rsub__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Amount(other - int(self))
+
+    def __neg__(self):
+        return Amount(-int(self))
+
+    def __abs__(self):
+        return Amount(abs(int(self)))
+
+
+def parse_amounts(values, array=False):
+    """
+    Parses TRTL values into atomic units, see `Amount.parse`.
+
+    Args:
+        values (iterable): strings, Decimals, ints or floats
+        array (bool): return a `numpy` int64 array instead of a list
+
+    Returns:
+        list or numpy.ndarray
+    """
+    atomic = [_parse(value) for value in values]
+    if array:
+        return _numpy().array(atomic, dtype='int64')
+    return atomic
+
+
+def format_amounts(amounts):
+    """
+    Formats atomic units as TRTL strings, e.g. 1025 as '10.25'.
+
+    Args:
+        amounts (list or numpy.ndarray): atomic units
+
+    Returns:
+        list: strings
+    """
+    # abs() of the smallest int64 overflows, format that in Python
+    if numpy is not None and isinstance(amounts, numpy.ndarray) and \
+            (not len(amounts) or amounts.min() > MIN_AMOUNT):
+        whole, fraction = numpy.divmod(numpy.abs(amounts), UNIT)
+        signs = numpy.where(amounts < 0, '-', '')
+        return [f'{s}{w}.{f:0{DECIMALS}d}' for s, w, f
+                in zip(signs.tolist(), whole.tolist(), fraction.tolist())]
+    return [_format(int(atomic)) for atomic in amounts]
+
+
+def sum_amounts(amounts):
+    """
+    Returns the exact sum of atomic units.
+
+    `numpy` sums of int64 arrays are computed in chunks that cannot
+    overflow.
+
+    Raises:
+        TypeError: if `amounts` is a `numpy` array without an integer
+            dtype
+        OverflowError: if the sum does not fit into 64 bits
+    """
+    if numpy is not None and isinstance(amounts, numpy.ndarray):
+        if not numpy.issubdtype(amounts.dtype, numpy.integer):
+            raise TypeError(f'amounts must be integers, not {amounts.dtype}')
+        if not len(amounts):
+            return 0
+        if amounts.dtype.kind == 'u':
+            _check_range(int(amounts.max()))
+        amounts = amounts.astype('int64', copy=False)
+        # the largest magnitude, as Python int so that it cannot overflow
+        bound = max(abs(int(amounts.min())), abs(int(amounts.max())), 1)
+        chunk = max(MAX_AMOUNT // bound, 1)
+        if chunk >= len(amounts):
+            total = int(amounts.sum())
+        else:
+            total = sum(int(amounts[i:i + chunk].sum())
+                        for i in range(0, len(amounts), chunk))
+    else:
+        total = sum(operator.index(atomic) for atomic in amounts)
+    return _check_range(total)
+
+
+def check_amounts(amounts):
+    """
+    Raises an `OverflowError` if an amount or the sum of all amounts
+    does not fit into 64 bits.
+    """
+    if numpy is None or not isinstance(amounts, numpy.ndarray):
+        for atomic in amounts:
+            _check_range(operator.index(atomic))
+    sum_amounts(amounts)
+
+
+def _numpy():
+    if numpy is None:
+        raise ImportError('array amounts require numpy')
+    return numpy
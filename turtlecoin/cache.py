@@ -0,0 +1,219 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache that evicts the least recently used entry
+    once it holds `maxsize` entries.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteCache:
+    """
+    Cache stored in a sqlite database so that it survives restarts.
+
+    Values need to be JSON serializable.
+
+    Args:
+        path (str): path of the database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM cache WHERE key = ?',
+                                     (key,)).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?)',
+                               (key, json.dumps(value)))
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cache')
+
+    def close(self):
+        self._conn.close()
+
+
+class BlockCache:
+    """
+    Reorg-aware cache for block headers, blocks and block hashes.
+
+    Blocks that are at least `confirmations` deep are stored permanently
+    in `backend`. Blocks closer to the tip are kept in memory and are
+    checked against the last block header, which is fetched at most every
+    `tip_ttl` seconds. If the tip (or a newly fetched block) does not link
+    to the cached blocks through its `prev_hash`, all blocks near the tip
+    are dropped.
+
+    Note:
+        Cached responses are returned as they were received, so the
+        `depth` field of a header is the depth at the time it was fetched.
+
+    Args:
+        backend: (optional) permanent storage, e.g. `SqliteCache`.
+            Defaults to a `LRUCache`.
+        confirmations (int): depth after which a block cannot change
+        tip_ttl (float): seconds to reuse the last block header
+    """
+
+    def __init__(self, backend=None, confirmations=60, tip_ttl=5):
+        self.backend = backend if backend is not None else LRUCache()
+        self.confirmations = confirmations
+        self.tip_ttl = tip_ttl
+        self.reorgs = 0
+        self._recent = {}
+        self._chain = {}
+        self._tip_height = None
+        self._tip_time = 0
+        self._lock = threading.RLock()
+
+    def lookup(self, key, fetch, describe, get_tip):
+        """
+        Returns the cached value for `key` or calls `fetch` and caches it.
+
+        Args:
+            key (str): cache key
+            fetch (callable): returns the value from the daemon
+            describe (callable): returns (height, hash, prev_hash) for a
+                value. Hashes can be None if they are not known.
+            get_tip (callable): returns the last block header response
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            entry = self._recent.get(key)
+        if entry is not None:
+            self._refresh_tip(get_tip)
+            with self._lock:
+                entry = self._recent.get(key)
+            if entry is not None:
+                height, value = entry
+                self._promote(key, height, value)
+                return value
+
+        value = fetch()
+        height, block_hash, prev_hash = describe(value)
+        self._refresh_tip(get_tip)
+        self.store(key, height, value, block_hash, prev_hash)
+        return value
+
+    def store(self, key, height, value, block_hash=None, prev_hash=None):
+        with self._lock:
+            if self._conflicts(height, block_hash, prev_hash):
+                self._drop_recent()
+            if block_hash is not None:
+                self._chain[height] = block_hash
+            if prev_hash is not None and height > 0:
+                self._chain.setdefault(height - 1, prev_hash)
+            self._recent[key] = (height, value)
+        self._promote(key, height, value)
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._chain.clear()
+            self._tip_height = None
+        self.backend.clear()
+
+    def _refresh_tip(self, get_tip):
+        if time.monotonic() - self._tip_time < self.tip_ttl:
+            return
+        header = get_tip()['result']['block_header']
+        with self._lock:
+            self._tip_time = time.monotonic()
+            height = header['height']
+            if self._conflicts(height, header['hash'], header['prev_hash']):
+                self._drop_recent()
+            elif self._tip_height is not None and height < self._tip_height:
+                # chain got shorter, a reorg replaced the top blocks
+                self._drop_recent()
+            elif height - 1 not in self._chain:
+                # the new tip cannot be linked to the cached blocks
+                self._drop_recent(reorg=False)
+            self._tip_height = height
+            self._chain[height] = header['hash']
+            self._chain[height - 1] = header['prev_hash']
+
+    def _conflicts(self, height, block_hash, prev_hash):
+        known = self._chain.get(height)
+        if block_hash is not None and known not in (None, block_hash):
+            return True
+        known = self._chain.get(height - 1)
+        return prev_hash is not None and known not in (None, prev_hash)
+
+    def _drop_recent(self, reorg=True):
+        if reorg:
+            self.reorgs += 1
+        self._recent.clear()
+        self._chain.clear()
+
+    def _promote(self, key, height, value):
+        if self._tip_height is None:
+            return
+        if self._tip_height - height < self.confirmations:
+            return
+        self.backend.set(key, value)
+        with self._lock:
+            self._recent.pop(key, None)
+            for h in [h for h in self._chain
+                      if self._tip_height - h >= self.confirmations]:
+                del self._chain[h]
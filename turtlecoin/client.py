@@ -0,0 +1,208 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .coalesce import RequestCoalescer
+from .codec import default_codec
+from .instrumentation import CallInfo
+
+logger = logging.getLogger(__name__)
+
+
+def create_session(pool_connections=10, pool_maxsize=10, pool_block=False,
+                   max_retries=0):
+    """
+    Create a `requests.Session` backed by a keep-alive connection pool
+
+    The returned session is thread-safe for the way the clients use it and
+    can be shared between several `Walletd` and `TurtleCoind` instances
+    by passing it as the `session` argument.
+
+    Args:
+        pool_connections (int): number of hosts to keep connection pools for
+        pool_maxsize (int): maximum number of connections kept per host
+        pool_block (bool): block when the pool is exhausted instead of
+            opening additional, non-pooled connections
+        max_retries (int): retries for failed connection attempts
+
+    Returns:
+        requests.Session
+    """
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          pool_block=pool_block,
+                          max_retries=max_retries)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class JSONRPCClient:
+    """
+    Base class for the RPC clients.
+
+    Owns the HTTP session that all request paths of a client go through.
+
+    Hooks can be attached to observe every request, see `add_hook`.
+
+    Payloads are encoded to and responses decoded from bytes by `codec`,
+    which defaults to the fastest installed JSON library (see
+    :func:`turtlecoin.codec.default_codec`).
+
+    With `coalesce` concurrent calls of hot read methods share one request,
+    `ttl` additionally caches their results for the given number of
+    seconds per RPC method, e.g. ``{'getinfo': 2}`` (see
+    :class:`turtlecoin.coalesce.RequestCoalescer`).
+    """
+
+    def __init__(self, url, session=None, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, codec=None,
+                 coalesce=False, ttl=None):
+        self.url = url
+        self.headers = {'content-type': 'application/json'}
+        self.codec = codec if codec is not None else default_codec()
+        # encoded bodies of requests without parameters
+        self._encoded = {}
+        self._pool_options = {'pool_connections': pool_connections,
+                              'pool_maxsize': pool_maxsize,
+                              'pool_block': pool_block}
+        self._owns_session = session is None
+        if session is None:
+            session = self._create_session()
+        self.session = session
+        self._hooks = []
+        self.coalescer = None
+        if coalesce or ttl:
+            self.coalescer = RequestCoalescer(ttl)
+
+    def _create_session(self):
+        return create_session(**self._pool_options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the connection pool if it was created by this client.
+        Shared sessions passed in by the caller are left open.
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def add_hook(self, post=None, pre=None):
+        """
+        Attaches instrumentation hooks to all requests of this client.
+
+        Without hooks no timing or size information is collected.
+
+        Args:
+            post (callable): called with a
+                :class:`~turtlecoin.instrumentation.CallInfo` after every
+                request, e.g. a
+                :class:`~turtlecoin.instrumentation.LatencyRecorder`
+            pre (callable): called with (method, url) before every request
+
+        Returns:
+            the handle to pass to `remove_hook`
+        """
+        hook = (pre, post)
+        self._hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def _coalesced(self, key, fetch, height_of=None):
+        if self.coalescer is None:
+            return fetch()
+        return self.coalescer.call(key, fetch, height_of)
+
+    def _post(self, url, payload):
+        response = self._send(url, payload)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    def _encode(self, payload):
+        if isinstance(payload, list) or payload.get('params'):
+            return self.codec.encode(payload)
+        key = (payload['method'], payload.get('password'))
+        data = self._encoded.get(key)
+        if data is None:
+            data = self._encoded[key] = self.codec.encode(payload)
+        return data
+
+    def _send(self, url, payload):
+        data = self._encode(payload)
+        method = _method_name(payload)
+        logger.debug('POST %s %s', url, method)
+        if not self._hooks:
+            response = self.session.post(url, data=data, headers=self.headers)
+            return self.codec.decode(response.content)
+        return self._instrumented(
+            method, url, len(data),
+            lambda: self.session.post(url, data=data, headers=self.headers))
+
+    def _get(self, url):
+        logger.debug('GET %s', url)
+        if not self._hooks:
+            return self.codec.decode(self.session.get(url).content)
+        method = url.rsplit('/', 1)[-1]
+        return self._instrumented(method, url, 0,
+                                  lambda: self.session.get(url))
+
+    def _instrumented(self, method, url, request_bytes, request):
+        self._call_pre_hooks(method, url)
+        started = time.perf_counter()
+        status = response_bytes = error = None
+        try:
+            response = request()
+            status = response.status_code
+            response_bytes = len(response.content)
+            result = self.codec.decode(response.content)
+            error = _error_code(result)
+            return result
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._call_post_hooks(CallInfo(
+                method, url, time.perf_counter() - started, request_bytes,
+                response_bytes, status, error))
+
+    def _call_pre_hooks(self, method, url):
+        for pre, _ in self._hooks:
+            if pre is not None:
+                try:
+                    pre(method, url)
+                except Exception:
+                    logger.exception('instrumentation hook failed')
+
+    def _call_post_hooks(self, info):
+        for _, post in self._hooks:
+            if post is not None:
+                try:
+                    post(info)
+                except Exception:
+                    logger.exception('instrumentation hook failed')
+
+
+def _method_name(payload):
+    if isinstance(payload, list):
+        return 'batch'
+    return payload.get('method')
+
+
+def _error_code(response):
+    if not isinstance(response, dict) or 'error' not in response:
+        return None
+    error = response['error']
+    if isinstance(error, dict):
+        return error.get('code', error)
+    return error
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class RequestCoalescer:
+    """
+    Shares the result of identical concurrent calls and caches it.
+
+    While a call for a key is running, other calls for the same key wait
+    for its result instead of sending their own request. Results are
+    reused for `ttl[key]` seconds. The cache is cleared when a result
+    reports a height above the highest height seen so far.
+
+    Note:
+        Callers receive the same result object, it should not be modified.
+
+    Args:
+        ttl (dict): seconds to cache the result per key, keys without an
+            entry are only coalesced
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = dict(ttl or {})
+        self.height = None
+        self._in_flight = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fetch, height_of=None):
+        """
+        Returns the result of `fetch()`, shared with concurrent calls for
+        the same `key`.
+
+        Args:
+            key: identifies the call
+            fetch (callable): sends the request
+            height_of (callable): (optional) returns the chain height
+                reported by a result
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fetch()
+            height = height_of(result) if height_of is not None else None
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        # the waiting calls are released even if the bookkeeping fails
+        try:
+            with self._lock:
+                del self._in_flight[key]
+                if height is not None:
+                    self._observe_height(height)
+                ttl = self.ttl.get(key)
+                if ttl:
+                    self._cache[key] = (time.monotonic() + ttl, result)
+        finally:
+            future.set_result(result)
+        return result
+
+    def invalidate(self):
+        """
+        Clears the cached results.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _observe_height(self, height):
+        if self.height is None or height > self.height:
+            if self.height is not None:
+                # a new block invalidates everything cached before it
+                self._cache.clear()
+            self.height = height
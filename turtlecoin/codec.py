@@ -0,0 +1,44 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONCodec:
+    """
+    Encodes and decodes JSON with the standard library.
+    """
+
+    name = 'json'
+
+    def encode(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    Encodes and decodes JSON with `orjson`.
+    """
+
+    name = 'orjson'
+
+    def encode(self, obj):
+        return orjson.dumps(obj)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+def default_codec():
+    """
+    Returns the fastest available codec: `OrjsonCodec` if `orjson` is
+    installed, otherwise `JSONCodec`.
+    """
+    if orjson is not None:
+        return OrjsonCodec()
+    return JSONCodec()
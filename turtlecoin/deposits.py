@@ -0,0 +1,155 @@
+import threading
+from collections import namedtuple
+
+Deposit = namedtuple('Deposit', ['key', 'transaction_hash', 'block_index',
+                                 'address', 'payment_id', 'amount',
+                                 'confirmations'])
+Deposit.__doc__ = """
+An incoming transfer that matched an outstanding deposit.
+
+Attributes:
+    key: the key the deposit was registered with
+    transaction_hash (str)
+    block_index (int)
+    address (str): receiving address
+    payment_id (str)
+    amount (int): received amount in atomic units
+    confirmations (int): number of blocks on top of the transaction's block
+"""
+
+
+class DepositMatcher:
+    """
+    Matches incoming transfers against many outstanding deposits at once.
+
+    Each `scan` fetches every new block window from walletd once and looks
+    up all transfers in in-memory indexes of the outstanding payment ids
+    and addresses, so the cost grows with the chain and not with the
+    number of outstanding deposits.
+
+    Example::
+
+        matcher = DepositMatcher(wallet, start_block_index=600000)
+        matcher.add(payment_id, key=order_id)
+        matcher.add(address=deposit_address, key=user_id)
+
+        for deposit in matcher.scan():
+            if deposit.confirmations >= matcher.confirmations:
+                credit(deposit.key, deposit.amount)
+
+    Args:
+        wallet (Walletd): the wallet receiving the deposits
+        start_block_index (int): first block to scan
+        confirmations (int): confirmations after which a deposit is final
+        window (int): number of blocks fetched per request
+        addresses (list): (optional) wallet addresses to scan. Defaults to
+            all addresses of the wallet.
+    """
+
+    def __init__(self, wallet, start_block_index=0, confirmations=10,
+                 window=1000, addresses=None):
+        self.wallet = wallet
+        self.next_block_index = start_block_index
+        self.confirmations = confirmations
+        self.window = window
+        self.addresses = addresses or []
+        self._by_payment_id = {}
+        self._by_address = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_payment_id) + len(self._by_address)
+
+    def add(self, payment_id=None, address=None, key=None):
+        """
+        Registers an outstanding deposit.
+
+        Args:
+            payment_id (str): (optional) expected payment id
+            address (str): (optional) receiving address. Together with a
+                payment id this matches deposits to the integrated address
+                of the two, on its own it matches all deposits to it.
+            key: (optional) returned with matched deposits, defaults to the
+                payment id or address
+        """
+        if payment_id is None and address is None:
+            raise ValueError('payment_id or address is required')
+        if key is None:
+            key = payment_id if payment_id is not None else address
+        with self._lock:
+            if payment_id is not None:
+                self._by_payment_id[payment_id] = (address, key)
+            else:
+                self._by_address[address] = key
+
+    def remove(self, payment_id=None, address=None):
+        """
+        Removes an outstanding deposit.
+        """
+        with self._lock:
+            if payment_id is not None:
+                self._by_payment_id.pop(payment_id, None)
+            else:
+                self._by_address.pop(address, None)
+
+    def scan(self):
+        """
+        Scans the blocks since the last scan.
+
+        Blocks with less than `confirmations` confirmations are scanned
+        again on the next call, so deposits in them are returned again
+        with an updated confirmation count until they are final.
+
+        Returns:
+            list: `Deposit` tuples in block order
+        """
+        block_count = self.wallet.get_status()['result']['blockCount']
+        final_block_count = max(block_count - self.confirmations + 1, 0)
+
+        deposits = []
+        first = self.next_block_index
+        while first < block_count:
+            count = min(self.window, block_count - first)
+            hashes = self.wallet.get_block_hashes(first, count)
+            hashes = hashes['result']['blockHashes']
+            if not hashes:
+                break
+            response = self.wallet.get_transactions(
+                self.addresses, hashes[0], len(hashes), '')
+            deposits.extend(self._match(response['result']['items'],
+                                        block_count))
+            first += len(hashes)
+        self.next_block_index = max(self.next_block_index,
+                                    min(first, final_block_count))
+        return deposits
+
+    def _match(self, items, block_count):
+        with self._lock:
+            by_payment_id = self._by_payment_id
+            by_address = self._by_address
+            deposits = []
+            for item in items:
+                for tx in item['transactions']:
+                    # outgoing transactions list their change as a
+                    # positive transfer to our own address
+                    if tx['amount'] < 0:
+                        continue
+                    expected = by_payment_id.get(tx['paymentId'])
+                    for transfer in tx['transfers']:
+                        # type 0 is a regular output, 2 is change
+                        if transfer['amount'] <= 0 or \
+                                transfer.get('type', 0) != 0:
+                            continue
+                        address = transfer['address']
+                        if expected is not None and \
+                                expected[0] in (None, address):
+                            key = expected[1]
+                        elif address in by_address:
+                            key = by_address[address]
+                        else:
+                            continue
+                        deposits.append(Deposit(
+                            key, tx['transactionHash'], tx['blockIndex'],
+                            address, tx['paymentId'], transfer['amount'],
+                            block_count - tx['blockIndex']))
+        return deposits
@@ -0,0 +1,345 @@
+"""
+Export the chain to partitioned columnar files.
+
+Blocks, transactions, their inputs and outputs are written to one
+directory per table, one file per partition of `partition_size` blocks::
+
+    export/
+        checkpoint.json
+        blocks/part-0000000000.parquet
+        transactions/part-0000000000.parquet
+        inputs/part-0000000000.parquet
+        outputs/part-0000000000.parquet
+
+Parquet needs `pyarrow`::
+
+    $ pip install turtlecoin[parquet]
+
+Without it CSV or JSON Lines files are written.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# columns of every table, as (name, type) with type 'int', 'str' or 'bool'
+SCHEMAS = {
+    'blocks': (
+        ('height', 'int'), ('hash', 'str'), ('prev_hash', 'str'),
+        ('timestamp', 'int'), ('difficulty', 'int'), ('nonce', 'int'),
+        ('major_version', 'int'), ('minor_version', 'int'),
+        ('reward', 'int'), ('base_reward', 'int'), ('penalty', 'int'),
+        ('block_size', 'int'), ('tx_count', 'int'),
+        ('total_fee_amount', 'int'), ('already_generated_coins', 'str'),
+    ),
+    'transactions': (
+        ('block_height', 'int'), ('block_hash', 'str'), ('index', 'int'),
+        ('hash', 'str'), ('fee', 'int'), ('amount_out', 'int'),
+        ('size', 'int'), ('mixin', 'int'), ('payment_id', 'str'),
+        ('version', 'int'), ('unlock_time', 'int'), ('coinbase', 'bool'),
+        ('input_count', 'int'), ('output_count', 'int'), ('extra', 'str'),
+    ),
+    'inputs': (
+        ('block_height', 'int'), ('tx_hash', 'str'), ('index', 'int'),
+        ('type', 'str'), ('amount', 'int'), ('key_image', 'str'),
+        ('key_offsets', 'str'),
+    ),
+    'outputs': (
+        ('block_height', 'int'), ('tx_hash', 'str'), ('index', 'int'),
+        ('type', 'str'), ('amount', 'int'), ('key', 'str'),
+    ),
+}
+
+
+def default_format():
+    """
+    Returns 'parquet' if `pyarrow` is installed, otherwise 'csv'.
+    """
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+class ParquetWriter:
+
+    TYPES = {'int': 'int64', 'str': 'string', 'bool': 'bool_'}
+
+    def __init__(self, path, schema):
+        self.columns = [name for name, _ in schema]
+        self.schema = pyarrow.schema([
+            (name, getattr(pyarrow, self.TYPES[kind])())
+            for name, kind in schema])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = {name: [row[i] for row in rows]
+                   for i, name in enumerate(self.columns)}
+        self._writer.write_table(
+            pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class CSVWriter:
+
+    def __init__(self, path, schema):
+        self._file = io.open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in schema])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLinesWriter:
+
+    def __init__(self, path, schema):
+        self.columns = [name for name, _ in schema]
+        self._file = io.open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.writelines(json.dumps(dict(zip(self.columns, row))) + '\n'
+                              for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+WRITERS = {'parquet': ParquetWriter, 'csv': CSVWriter,
+           'jsonl': JSONLinesWriter}
+
+
+def block_rows(block, transactions):
+    """
+    Turns a block (`get_block` result) and its transactions
+    (`get_transaction` results) into rows of every table.
+
+    Returns:
+        dict: list of rows per table
+    """
+    rows = {'blocks': [(
+        block['height'], block['hash'], block['prev_hash'],
+        block['timestamp'], block['difficulty'], block.get('nonce'),
+        block.get('major_version'), block.get('minor_version'),
+        block.get('reward'), block.get('baseReward'), block.get('penalty'),
+        block.get('blockSize'), len(block['transactions']),
+        block.get('totalFeeAmount'), block.get('alreadyGeneratedCoins'),
+    )], 'transactions': [], 'inputs': [], 'outputs': []}
+
+    height, block_hash = block['height'], block['hash']
+    for index, tx in enumerate(transactions):
+        details, prefix = tx['txDetails'], tx['tx']
+        tx_hash = details['hash']
+        vin, vout = prefix.get('vin', []), prefix.get('vout', [])
+        coinbase = bool(vin) and vin[0]['type'] == 'ff'
+        rows['transactions'].append((
+            height, block_hash, index, tx_hash, details.get('fee'),
+            details.get('amount_out'), details.get('size'),
+            details.get('mixin'), details.get('paymentId'),
+            prefix.get('version'), prefix.get('unlock_time'), coinbase,
+            len(vin), len(vout), prefix.get('extra'),
+        ))
+        for i, txin in enumerate(vin):
+            value = txin['value']
+            offsets = value.get('key_offsets')
+            rows['inputs'].append((
+                height, tx_hash, i, txin['type'], value.get('amount'),
+                value.get('k_image'),
+                ','.join(map(str, offsets)) if offsets else None,
+            ))
+        for i, txout in enumerate(vout):
+            target = txout['target']
+            rows['outputs'].append((
+                height, tx_hash, i, target.get('type'), txout['amount'],
+                target.get('data', {}).get('key'),
+            ))
+    return rows
+
+
+class ChainExporter:
+    """
+    Exports the chain to partitioned files and resumes where it stopped.
+
+    The blocks of a partition are fetched in row groups of
+    `row_group_size` blocks with `workers` concurrent requests and
+    written before the next row group is fetched, so memory use does not
+    depend on the partition size. Files are written under a temporary
+    name and renamed when the partition is complete, then the partition
+    is recorded in ``checkpoint.json`` together with the hash of its last
+    block.
+
+    On every run the recorded partitions are checked against the chain,
+    newest first. Partitions whose last block changed in a reorg are
+    exported again, as is the partition containing the top block, which
+    is only exported up to `confirmations` blocks below the top::
+
+        exporter = ChainExporter(TurtleCoind(), 'export')
+        exporter.run()
+
+    Args:
+        daemon (TurtleCoind)
+        directory (str): directory the files are written to
+        partition_size (int): number of blocks per file
+        format (str): 'parquet', 'csv' or 'jsonl', defaults to parquet
+            if `pyarrow` is installed and csv otherwise
+        workers (int): number of concurrent requests
+        row_group_size (int): number of blocks fetched and written at once
+        confirmations (int): number of blocks below the top that are not
+            exported yet
+    """
+
+    def __init__(self, daemon, directory, partition_size=10000, format=None,
+                 workers=8, row_group_size=100, confirmations=10):
+        self.daemon = daemon
+        self.directory = directory
+        self.partition_size = partition_size
+        self.format = format or default_format()
+        if self.format not in WRITERS:
+            raise ValueError(f'unknown format {self.format!r}')
+        if self.format == 'parquet' and pyarrow is None:
+            raise ValueError('the parquet format requires pyarrow')
+        self.workers = workers
+        self.row_group_size = row_group_size
+        self.confirmations = confirmations
+        self.checkpoint_path = os.path.join(directory, 'checkpoint.json')
+        self.partitions = {}
+        self._load_checkpoint()
+
+    def run(self, start=0, end=None):
+        """
+        Exports the partitions from `start` to `end` that are missing,
+        incomplete or changed by a reorg.
+
+        Args:
+            start (int): height in the first partition to export
+            end (int): (optional) last height to export, defaults to
+                `confirmations` blocks below the top block
+
+        Returns:
+            list: the first heights of the exported partitions
+        """
+        top = self.daemon.get_block_count()['result']['count'] - 1
+        if end is None:
+            end = top - self.confirmations
+        end = min(end, top)
+        self._check_reorgs()
+
+        first = start - start % self.partition_size
+        exported = []
+        for partition in range(first, end + 1, self.partition_size):
+            last = min(partition + self.partition_size - 1, end)
+            done = self.partitions.get(partition)
+            if done is not None and done['end'] >= last:
+                continue
+            self.export_partition(partition, last)
+            exported.append(partition)
+        return exported
+
+    def export_partition(self, start, end):
+        """
+        Writes the blocks from `start` to `end` (inclusive) as the
+        partition starting at `start` and records it in the checkpoint.
+        """
+        logger.info('exporting blocks %d to %d', start, end)
+        paths = {}
+        writers = {}
+        for table, schema in SCHEMAS.items():
+            path = self._path(table, start)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            paths[table] = path
+            writers[table] = WRITERS[self.format](path + '.tmp', schema)
+
+        last_hash = None
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                group = []
+                for header in self.daemon.iter_blocks(
+                        start, end, workers=self.workers):
+                    group.append(header['hash'])
+                    if len(group) == self.row_group_size:
+                        self._write_group(executor, group, writers)
+                        group = []
+                    last_hash = header['hash']
+                if group:
+                    self._write_group(executor, group, writers)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        for path in paths.values():
+            os.replace(path + '.tmp', path)
+
+        self.partitions[start] = {'end': end, 'hash': last_hash}
+        self._save_checkpoint()
+
+    def _write_group(self, executor, hashes, writers):
+        blocks = list(executor.map(
+            lambda h: self.daemon.get_block(h)['result']['block'], hashes))
+        tx_hashes = [tx['hash'] for block in blocks
+                     for tx in block['transactions']]
+        transactions = iter(executor.map(
+            lambda h: self.daemon.get_transaction(h)['result'], tx_hashes))
+
+        rows = {table: [] for table in SCHEMAS}
+        for block in blocks:
+            txs = [next(transactions) for _ in block['transactions']]
+            for table, table_rows in block_rows(block, txs).items():
+                rows[table].extend(table_rows)
+        for table, table_rows in rows.items():
+            if table_rows:
+                writers[table].write(table_rows)
+
+    def _check_reorgs(self):
+        # a partition whose last block is unchanged means that all
+        # partitions before it are unchanged too
+        changed = False
+        for start in sorted(self.partitions, reverse=True):
+            done = self.partitions[start]
+            header = self.daemon.get_block_header_by_height(done['end'])
+            if header['result']['block_header']['hash'] == done['hash']:
+                break
+            logger.warning('partition %d changed by a reorg', start)
+            del self.partitions[start]
+            changed = True
+        if changed:
+            self._save_checkpoint()
+
+    def _path(self, table, start):
+        return os.path.join(self.directory, table,
+                            f'part-{start:010d}.{self.format}')
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return
+        if checkpoint['format'] != self.format or \
+                checkpoint['partition_size'] != self.partition_size:
+            raise ValueError(f'{self.checkpoint_path} was written with '
+                             f'another format or partition size')
+        self.partitions = {int(start): done for start, done
+                           in checkpoint['partitions'].items()}
+
+    def _save_checkpoint(self):
+        os.makedirs(self.directory, exist_ok=True)
+        checkpoint = {'format': self.format,
+                      'partition_size': self.partition_size,
+                      'partitions': {str(start): done for start, done
+                                     in sorted(self.partitions.items())}}
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(checkpoint, f, indent=1)
+        os.replace(tmp, self.checkpoint_path)
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ChainFollower:
+    """
+    Follows the chain of a `TurtleCoind` and emits events for new blocks
+    and reorganizations.
+
+    The daemon is polled at the time the next block is expected. If it is
+    late the follower backs off exponentially from `min_interval` up to
+    `max_interval`. Only the headers of new blocks are fetched.
+
+    Example::
+
+        follower = ChainFollower(TurtleCoind())
+
+        @follower.on_block
+        def handle_block(header):
+            print(header['height'], header['hash'])
+
+        follower.run()
+
+    Or from asyncio::
+
+        async for event, value in follower:
+            ...
+
+    Args:
+        daemon (TurtleCoind): the daemon to follow
+        start_height (int): (optional) first height to emit. Defaults to
+            the current top block.
+        block_time (int): expected seconds between blocks
+        min_interval (float): shortest time between polls
+        max_interval (float): longest time between polls
+        max_reorg_depth (int): number of block hashes kept to find the
+            fork height of a reorganization
+    """
+
+    def __init__(self, daemon, start_height=None, block_time=30,
+                 min_interval=1, max_interval=10, max_reorg_depth=100):
+        self.daemon = daemon
+        self.block_time = block_time
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_reorg_depth = max_reorg_depth
+        self.next_height = start_height
+        self.synced = False
+        self._hashes = OrderedDict()
+        self._last_header = None
+        self._misses = 0
+        self._listeners = {'block': [], 'reorg': [], 'synced': []}
+        self._stop = threading.Event()
+
+    def on_block(self, callback):
+        """
+        Registers `callback(header)`, called for every new block in
+        height order. Can be used as decorator.
+        """
+        self._listeners['block'].append(callback)
+        return callback
+
+    def on_reorg(self, callback):
+        """
+        Registers `callback(fork_height)`, called when the blocks from
+        `fork_height` on were replaced or removed. The new blocks are
+        emitted with `on_block` afterwards. Can be used as decorator.
+        """
+        self._listeners['reorg'].append(callback)
+        return callback
+
+    def on_synced(self, callback):
+        """
+        Registers `callback(height)`, called when the follower has caught
+        up with the top block. Can be used as decorator.
+        """
+        self._listeners['synced'].append(callback)
+        return callback
+
+    def poll(self):
+        """
+        Fetches new blocks once and notifies the listeners.
+
+        Returns:
+            list: the emitted events as (event, value) tuples
+        """
+        tip = self.daemon.get_last_block_header()['result']['block_header']
+        if self.next_height is None:
+            self.next_height = tip['height']
+
+        if tip['height'] > self.next_height:
+            # more than one block behind
+            self.synced = False
+
+        events = []
+        fork_height = self._check_tip(tip)
+        if fork_height is not None:
+            self._rollback(fork_height)
+            events.append(('reorg', fork_height))
+
+        while self.next_height <= tip['height']:
+            heights = range(self.next_height,
+                            min(tip['height'] + 1,
+                                self.next_height + self.daemon.batch_size))
+            headers = self._fetch_headers(heights)
+            fork_height = self._find_fork(headers[0])
+            if fork_height is not None:
+                self._rollback(fork_height)
+                events.append(('reorg', fork_height))
+                continue
+            for header in headers:
+                if self._hashes and not self._links(header):
+                    # reorg while we were fetching, start over
+                    break
+                self._remember(header)
+                events.append(('block', header))
+
+        if not self.synced:
+            self.synced = True
+            events.append(('synced', self.next_height - 1))
+
+        for event, value in events:
+            for callback in self._listeners[event]:
+                callback(value)
+        return events
+
+    def next_interval(self, got_block):
+        """
+        Returns the number of seconds to wait before the next poll.
+        """
+        if got_block and self._last_header is not None:
+            self._misses = 0
+            expected = self._last_header['timestamp'] + self.block_time
+            wait = expected - time.time()
+            if wait > self.min_interval:
+                return min(wait, self.block_time)
+        delay = self.min_interval * 2 ** self._misses
+        self._misses += 1
+        return min(delay, self.max_interval)
+
+    def run(self):
+        """
+        Polls the daemon until `stop` is called.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                events = self.poll()
+            except Exception:
+                logger.exception('polling the daemon failed')
+                events = []
+            got_block = any(event == 'block' for event, _ in events)
+            self._stop.wait(self.next_interval(got_block))
+
+    def start(self):
+        """
+        Runs the follower in a daemon thread.
+
+        Returns:
+            threading.Thread
+        """
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        """
+        Asynchronously yields (event, value) tuples. The polling runs in
+        the default executor.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                events = await loop.run_in_executor(None, self.poll)
+            except Exception:
+                logger.exception('polling the daemon failed')
+                events = []
+            for event in events:
+                yield event
+            got_block = any(event == 'block' for event, _ in events)
+            await asyncio.sleep(self.next_interval(got_block))
+
+    def _fetch_headers(self, heights):
+        headers = []
+        for response in self.daemon.get_block_headers_by_height(heights):
+            if isinstance(response, Exception):
+                raise response
+            headers.append(response['result']['block_header'])
+        return headers
+
+    def _links(self, header):
+        return self._hashes.get(header['height'] - 1) == header['prev_hash']
+
+    def _find_fork(self, header):
+        if not self._hashes or self._links(header):
+            return None
+        height = header['height'] - 1
+        while height in self._hashes:
+            response = self.daemon.get_block_header_by_height(height)
+            known = response['result']['block_header']
+            if self._hashes[height] == known['hash']:
+                return height + 1
+            height -= 1
+        # the fork is deeper than max_reorg_depth
+        return height + 1
+
+    def _check_tip(self, tip):
+        # a tip below the next height is either a replaced block at a
+        # known height or a shorter chain
+        if not self._hashes or tip['height'] >= self.next_height:
+            return None
+        if self._hashes.get(tip['height']) == tip['hash']:
+            if tip['height'] + 1 < self.next_height:
+                return tip['height'] + 1
+            return None
+        fork_height = self._find_fork(tip)
+        return tip['height'] if fork_height is None else fork_height
+
+    def _rollback(self, fork_height):
+        for height in [h for h in self._hashes if h >= fork_height]:
+            del self._hashes[height]
+        self.next_height = fork_height
+        self._last_header = None
+
+    def _remember(self, header):
+        self._hashes[header['height']] = header['hash']
+        while len(self._hashes) > self.max_reorg_depth:
+            self._hashes.popitem(last=False)
+        self._last_header = header
+        self.next_height = header['height'] + 1
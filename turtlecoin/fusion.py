@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class FusionScheduler:
+    """
+    Optimizes the outputs of a wallet with fusion transactions.
+
+    The scheduler periodically estimates the fusion-ready outputs for
+    several thresholds and sends a fusion transaction with the threshold
+    that merges the most outputs. Fusions only run when the wallet was
+    idle for `idle_time` seconds. Wrap other sends in `busy` to delay
+    fusions and to keep them from running at the same time::
+
+        scheduler = FusionScheduler(wallet, destination_address=address)
+        scheduler.start()
+
+        with scheduler.busy():
+            payout_engine.flush()
+
+    Args:
+        wallet (Walletd): the wallet to optimize
+        addresses (list): (optional) addresses to take outputs from.
+            Defaults to all addresses of the wallet.
+        destination_address (str): address receiving the merged outputs,
+            required if the wallet has more than one address
+        thresholds (tuple): thresholds passed to `estimate_fusion`
+        min_outputs (int): minimum number of fusion-ready outputs to send
+            a fusion transaction
+        anonymity (int): mixin of the fusion transactions
+        interval (float): seconds between two checks
+        idle_time (float): seconds without activity before fusing
+    """
+
+    def __init__(self, wallet, addresses=None, destination_address='',
+                 thresholds=(1000, 10000, 100000, 1000000, 10000000),
+                 min_outputs=12, anonymity=3, interval=60, idle_time=30):
+        self.wallet = wallet
+        self.addresses = addresses or []
+        self.destination_address = destination_address
+        self.thresholds = sorted(thresholds)
+        self.min_outputs = min_outputs
+        self.anonymity = anonymity
+        self.interval = interval
+        self.idle_time = idle_time
+        self.metrics = {'total_outputs': None, 'fusion_ready': None,
+                        'threshold': None, 'fusions': 0, 'failed': 0}
+        self._last_activity = 0
+        # number of running busy blocks and whether a fusion is running
+        self._active = 0
+        self._fusing = False
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+
+    @contextmanager
+    def busy(self):
+        """
+        Marks the wallet as busy while the block is running.
+
+        Busy blocks run concurrently, they only wait for a running fusion.
+        """
+        with self._condition:
+            self._last_activity = time.monotonic()
+            while self._fusing:
+                self._condition.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._last_activity = time.monotonic()
+
+    def is_idle(self):
+        return time.monotonic() - self._last_activity >= self.idle_time
+
+    def estimate(self):
+        """
+        Estimates fusion-ready outputs for all thresholds.
+
+        Returns:
+            tuple: (threshold, fusion-ready outputs, total outputs) of the
+            smallest threshold with the most fusion-ready outputs
+        """
+        best = None
+        for threshold in self.thresholds:
+            result = self.wallet.estimate_fusion(threshold, self.addresses)
+            result = result['result']
+            ready = result['fusionReadyCount']
+            if best is None or ready > best[1]:
+                best = (threshold, ready, result['totalOutputCount'])
+        threshold, ready, total = best
+        self.metrics.update(threshold=threshold, fusion_ready=ready,
+                            total_outputs=total)
+        return best
+
+    def run_once(self):
+        """
+        Sends a fusion transaction if the wallet is idle and enough
+        outputs can be merged.
+
+        Returns:
+            str: hash of the fusion transaction or None
+        """
+        with self._condition:
+            if self._active or self._fusing or not self.is_idle():
+                return None
+            self._fusing = True
+        try:
+            threshold, ready, _ = self.estimate()
+            if ready < self.min_outputs:
+                return None
+            try:
+                response = self.wallet.send_fusion_transaction(
+                    threshold, self.anonymity, self.addresses,
+                    self.destination_address)
+            except ValueError as e:
+                self.metrics['failed'] += 1
+                logger.warning('fusion transaction failed: %s', e)
+                return None
+            self.metrics['fusions'] += 1
+            return response['result']['transactionHash']
+        finally:
+            with self._condition:
+                self._fusing = False
+                self._condition.notify_all()
+
+    def run(self):
+        """
+        Checks every `interval` seconds until `stop` is called.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('fusion check failed')
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """
+        Runs the scheduler in a daemon thread.
+
+        Returns:
+            threading.Thread
+        """
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,261 @@
+import binascii
+import struct
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'TRTLHDR2'
+# files without the mask of missing columns
+MAGIC_V1 = b'TRTLHDR1'
+
+# integer columns, stored as int64
+COLUMNS = ('height', 'timestamp', 'difficulty', 'reward', 'size', 'tx_count')
+
+# the header field names differ between the RPC methods
+FIELDS = {
+    'height': ('height',),
+    'timestamp': ('timestamp',),
+    'difficulty': ('difficulty',),
+    'reward': ('reward',),
+    'size': ('cumul_size', 'block_size', 'blockSize'),
+    'tx_count': ('tx_count', 'num_txes'),
+}
+
+HASH_SIZE = 32
+
+
+def _field(header, names):
+    for name in names:
+        value = header.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class HeaderTable:
+    """
+    Compact columnar storage for block headers.
+
+    Every column is a typed array of 64 bit integers, the block hashes are
+    stored as 32 raw bytes. A header takes 80 bytes instead of several
+    hundred bytes as a dict.
+
+    Headers from `get_blocks`, `iter_blocks`, `get_block_header_by_height`
+    and `get_last_block_header` can be appended and have to be appended in
+    height order without gaps. Fields a header does not have are stored
+    as 0 and the column is marked as missing, `column` and the analytics
+    using it raise a `ValueError` then. `get_blocks` and `iter_blocks`
+    entries have no reward, use headers from `get_block_header_by_height`
+    for `reward_stats`.
+
+    The analytics methods require `numpy`::
+
+        $ pip install turtlecoin[numpy]
+
+    Example::
+
+        table = HeaderTable()
+        table.extend(daemon.iter_blocks(0))
+        table.save('headers.bin')
+
+        table = HeaderTable.load('headers.bin')
+        table.hashrate(window=60)
+    """
+
+    def __init__(self):
+        self._columns = {name: array('q') for name in COLUMNS}
+        self._hashes = bytearray()
+        # columns a field was missing for in at least one header
+        self.missing = set()
+
+    def __len__(self):
+        return len(self._columns['height'])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('header index out of range')
+        row = {name: self._columns[name][index] for name in COLUMNS}
+        offset = index * HASH_SIZE
+        row['hash'] = self._hashes[offset:offset + HASH_SIZE].hex()
+        return row
+
+    @property
+    def start_height(self):
+        return self._columns['height'][0] if len(self) else None
+
+    @property
+    def end_height(self):
+        return self._columns['height'][-1] if len(self) else None
+
+    def append(self, header):
+        """
+        Appends a header.
+
+        Args:
+            header (dict): a header or a `get_blocks` entry. RPC responses
+                wrapping a `block_header` are unwrapped.
+
+        Raises:
+            ValueError: if the height does not follow the last height
+        """
+        if 'result' in header:
+            header = header['result']
+        header = header.get('block_header', header)
+        if len(self) and header['height'] != self.end_height + 1:
+            raise ValueError(f'expected height {self.end_height + 1}, '
+                             f'got {header["height"]}')
+        for name in COLUMNS:
+            value = _field(header, FIELDS[name])
+            if value is None:
+                self.missing.add(name)
+                value = 0
+            self._columns[name].append(value)
+        self._hashes += binascii.unhexlify(header['hash'])
+
+    def extend(self, headers):
+        for header in headers:
+            self.append(header)
+
+    def truncate(self, height):
+        """
+        Removes all headers from `height` on, e.g. after a reorg.
+        """
+        if not len(self) or height > self.end_height:
+            return
+        keep = max(height - self.start_height, 0)
+        for name in COLUMNS:
+            del self._columns[name][keep:]
+        del self._hashes[keep * HASH_SIZE:]
+        if not keep:
+            self.missing.clear()
+
+    def column(self, name):
+        """
+        Returns a copy of a column as `numpy.ndarray`.
+
+        Args:
+            name (str): one of height, timestamp, difficulty, reward, size
+                or tx_count
+
+        Raises:
+            ValueError: if the column is missing for some headers
+        """
+        if name in self.missing:
+            raise ValueError(f'{name} is missing for some headers')
+        # copy so that the array can still grow while the result is used
+        column = self._columns[name]
+        return self._numpy().frombuffer(column, dtype='int64').copy()
+
+    def block_times(self):
+        """
+        Returns the seconds between consecutive blocks.
+        """
+        return self._numpy().diff(self.column('timestamp'))
+
+    def rolling_difficulty(self, window=60):
+        """
+        Returns the average difficulty over the last `window` blocks for
+        every block from the `window`-th block on.
+        """
+        return self._rolling_sum(self.column('difficulty'), window) / window
+
+    def hashrate(self, window=60):
+        """
+        Returns the estimated network hashrate in H/s over the last
+        `window` blocks for every block from the `window + 1`-th block on.
+        """
+        np = self._numpy()
+        difficulty = self._rolling_sum(self.column('difficulty')[1:], window)
+        seconds = self._rolling_sum(self.block_times(), window)
+        return difficulty / np.maximum(seconds, 1)
+
+    def block_time_stats(self):
+        """
+        Returns mean, median, min, max and standard deviation of the
+        block times.
+        """
+        return self._stats(self.block_times())
+
+    def reward_stats(self):
+        """
+        Returns total, mean, median, min, max and standard deviation of
+        the block rewards.
+        """
+        rewards = self.column('reward')
+        stats = self._stats(rewards)
+        stats['total'] = int(rewards.sum())
+        return stats
+
+    def save(self, path):
+        """
+        Saves the table to a binary file.
+        """
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(self)))
+            f.write(struct.pack('<Q', sum(1 << i for i, name
+                                          in enumerate(COLUMNS)
+                                          if name in self.missing)))
+            for name in COLUMNS:
+                column = self._columns[name]
+                if sys.byteorder != 'little':
+                    column = array('q', column)
+                    column.byteswap()
+                f.write(column.tobytes())
+            f.write(self._hashes)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a table saved with `save`.
+        """
+        table = cls()
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic not in (MAGIC, MAGIC_V1):
+                raise ValueError(f'{path} is not a header table')
+            count, = struct.unpack('<Q', f.read(8))
+            if magic == MAGIC:
+                mask, = struct.unpack('<Q', f.read(8))
+                table.missing = {name for i, name in enumerate(COLUMNS)
+                                 if mask & 1 << i}
+            for name in COLUMNS:
+                column = table._columns[name]
+                column.frombytes(f.read(count * column.itemsize))
+                if sys.byteorder != 'little':
+                    column.byteswap()
+            table._hashes = bytearray(f.read(count * HASH_SIZE))
+        if any(len(c) != count for c in table._columns.values()) or \
+                len(table._hashes) != count * HASH_SIZE:
+            raise ValueError(f'{path} is truncated')
+        return table
+
+    def _rolling_sum(self, values, window):
+        np = self._numpy()
+        if len(values) < window:
+            return np.zeros(0)
+        sums = np.cumsum(values, dtype='float64')
+        sums[window:] = sums[window:] - sums[:-window]
+        return sums[window - 1:]
+
+    def _stats(self, values):
+        np = self._numpy()
+        if not len(values):
+            return {}
+        return {'mean': float(values.mean()),
+                'median': float(np.median(values)),
+                'min': int(values.min()),
+                'max': int(values.max()),
+                'std': float(values.std())}
+
+    @staticmethod
+    def _numpy():
+        if numpy is None:
+            raise ImportError('HeaderTable analytics require numpy')
+        return numpy
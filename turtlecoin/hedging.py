@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                TimeoutError, wait)
+
+# TurtleCoind JSON-RPC methods that only read data and can be sent twice
+IDEMPOTENT_METHODS = frozenset([
+    'getblockcount',
+    'on_getblockhash',
+    'getlastblockheader',
+    'getblockheaderbyhash',
+    'getblockheaderbyheight',
+    'getcurrencyid',
+    'f_blocks_list_json',
+    'f_block_json',
+    'f_transaction_json',
+    'f_on_transactions_pool_json',
+])
+
+
+class Hedger:
+    """
+    Sends a second request if the first one is slow.
+
+    If the first request has not answered within the `percentile`-th
+    percentile of the recent latencies of the method after it was sent,
+    the backup request is started and the first answer is used. The
+    slower request is cancelled if it has not started yet, otherwise its
+    answer is discarded.
+
+    Only use it for idempotent reads, see `IDEMPOTENT_METHODS`.
+
+    Args:
+        percentile (float): latency percentile after which to hedge
+        min_delay (float): shortest hedging delay in seconds
+        max_delay (float): longest hedging delay in seconds, also used
+            until enough latencies were recorded
+        window (int): number of latencies kept per method
+        workers (int): maximum number of concurrent requests
+    """
+
+    # latencies needed before the percentile is used
+    MIN_SAMPLES = 20
+
+    def __init__(self, percentile=95, min_delay=0.005, max_delay=1.0,
+                 window=500, workers=32):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.stats = {'requests': 0, 'hedged': 0, 'backup_wins': 0}
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def delay(self, method):
+        """
+        Returns the hedging delay for `method` in seconds.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(method, ()))
+        if len(latencies) < self.MIN_SAMPLES:
+            return self.max_delay
+        index = min(int(len(latencies) * self.percentile / 100),
+                    len(latencies) - 1)
+        return min(max(latencies[index], self.min_delay), self.max_delay)
+
+    def run(self, method, primary, backup):
+        """
+        Calls `primary()` and, if it is slow, `backup()`.
+
+        Returns:
+            the result of the call that finished first successfully
+        """
+        delay = self.delay(method)
+        started = threading.Event()
+
+        def timed():
+            started.set()
+            begin = time.perf_counter()
+            try:
+                return primary()
+            finally:
+                self._record(method, time.perf_counter() - begin)
+
+        first = self._executor.submit(timed)
+        with self._lock:
+            self.stats['requests'] += 1
+        # the delay starts when the request is sent, a request waiting
+        # for a free worker is not hedged
+        started.wait()
+        try:
+            return first.result(timeout=delay)
+        except TimeoutError:
+            pass
+
+        second = self._executor.submit(backup)
+        with self._lock:
+            self.stats['hedged'] += 1
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [f for f in done if f.exception() is None]
+            if succeeded or not pending:
+                # a failed request waits for the other one
+                winner = succeeded[0] if succeeded else done.pop()
+                for other in pending:
+                    other.cancel()
+                if winner is second and succeeded:
+                    with self._lock:
+                        self.stats['backup_wins'] += 1
+                return winner.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _record(self, method, seconds):
+        with self._lock:
+            latencies = self._latencies.get(method)
+            if latencies is None:
+                latencies = self._latencies[method] = deque(
+                    maxlen=self.window)
+            latencies.append(seconds)
@@ -0,0 +1,112 @@
+import bisect
+import threading
+from collections import namedtuple
+
+CallInfo = namedtuple('CallInfo', ['method', 'url', 'seconds',
+                                   'request_bytes', 'response_bytes',
+                                   'status', 'error'])
+CallInfo.__doc__ = """
+Information about one HTTP request, passed to post hooks.
+
+Attributes:
+    method (str): RPC method, 'batch' for batches or the path of GET calls
+    url (str)
+    seconds (float): wall time of the request
+    request_bytes (int): size of the request body
+    response_bytes (int): size of the response body, None if the request
+        failed before a response was received
+    status (int): HTTP status code, None if there was no response
+    error: the JSON-RPC error code, or the exception class name if the
+        request raised, otherwise None
+"""
+
+# upper bounds of the histogram buckets in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1, 2.5, 5, 10, float('inf'))
+
+
+class LatencyHistogram:
+    """
+    Histogram of request latencies with fixed logarithmic buckets.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q):
+        """
+        Returns the upper bound of the bucket containing the `q`-th
+        percentile (0-100), capped at the largest observed value.
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+
+class LatencyRecorder:
+    """
+    Post hook that keeps a latency histogram and error count per method.
+
+    Example::
+
+        recorder = LatencyRecorder()
+        daemon.add_hook(recorder)
+        ...
+        recorder.summary()
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, info):
+        with self._lock:
+            histogram = self.histograms.get(info.method)
+            if histogram is None:
+                histogram = self.histograms[info.method] = LatencyHistogram()
+            histogram.add(info.seconds)
+            if info.error is not None:
+                self.errors[info.method] = self.errors.get(info.method, 0) + 1
+
+    def summary(self):
+        """
+        Returns count, errors, mean, p50, p90, p99 and max latency in
+        seconds per method.
+        """
+        with self._lock:
+            return {method: {'count': h.count,
+                             'errors': self.errors.get(method, 0),
+                             'mean': h.mean,
+                             'p50': h.percentile(50),
+                             'p90': h.percentile(90),
+                             'p99': h.percentile(99),
+                             'max': h.max}
+                    for method, h in self.histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
@@ -0,0 +1,93 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+MempoolChanges = namedtuple('MempoolChanges', ['added', 'mined', 'evicted'])
+MempoolChanges.__doc__ = """
+Changes of the transaction pool since the last update.
+
+Attributes:
+    added (dict): hash -> `get_transaction` result of the new transactions
+    mined (dict): hash -> `get_transaction` result of the transactions that
+        left the pool because they were included in a block
+    evicted (list): hashes of transactions that were dropped from the pool
+"""
+
+
+class MempoolTracker:
+    """
+    Tracks the transaction pool of a `TurtleCoind`.
+
+    Each `update` fetches the list of pool hashes and only requests the
+    details of transactions that were not seen before. Transactions that
+    left the pool are looked up to tell mined from evicted transactions.
+
+    Example::
+
+        tracker = MempoolTracker(TurtleCoind())
+        while True:
+            changes = tracker.update()
+            for tx_hash, tx in changes.added.items():
+                ...
+            time.sleep(5)
+
+    Args:
+        daemon (TurtleCoind): the daemon to track
+        workers (int): number of concurrent `get_transaction` calls
+    """
+
+    def __init__(self, daemon, workers=8):
+        self.daemon = daemon
+        self.workers = workers
+        self.transactions = {}
+
+    def __contains__(self, tx_hash):
+        return tx_hash in self.transactions
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def update(self):
+        """
+        Fetches the transaction pool and returns the changes.
+
+        Returns:
+            MempoolChanges
+        """
+        response = self.daemon.get_transaction_pool()
+        pool = {tx['hash']: tx for tx in response['result']['transactions']}
+
+        added_hashes = pool.keys() - self.transactions.keys()
+        removed_hashes = self.transactions.keys() - pool.keys()
+        lookups = self._get_transactions(added_hashes | removed_hashes)
+
+        added = {}
+        for tx_hash in added_hashes:
+            tx = lookups[tx_hash]
+            if tx is not None:
+                added[tx_hash] = tx
+                self.transactions[tx_hash] = tx
+
+        mined = {}
+        evicted = []
+        for tx_hash in removed_hashes:
+            del self.transactions[tx_hash]
+            tx = lookups[tx_hash]
+            if tx is not None and tx.get('block', {}).get('hash'):
+                mined[tx_hash] = tx
+            else:
+                evicted.append(tx_hash)
+
+        return MempoolChanges(added, mined, evicted)
+
+    def _get_transactions(self, hashes):
+        def fetch(tx_hash):
+            try:
+                return self.daemon.get_transaction(tx_hash)['result']
+            except ValueError:
+                return None
+
+        hashes = list(hashes)
+        if not hashes:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(hashes, executor.map(fetch, hashes)))
@@ -0,0 +1,311 @@
+"""
+Typed, memory efficient response objects.
+
+The models use `__slots__`, store hashes as 32 raw bytes and only turn
+nested lists (like the transactions of a block) into objects when they are
+first accessed. `raw` returns the original dict::
+
+    from turtlecoin.models import typed
+
+    daemon = typed(TurtleCoind())
+    block = daemon.get_block(block_hash)
+    block.height, block.hash.hex()
+    block.transactions[0].fee
+    block.raw
+"""
+
+HASH = 'hash'
+
+
+def _lazy_property(slot, kind):
+    many = isinstance(kind, list)
+    model = kind[0] if many else kind
+
+    def getter(self):
+        value = getattr(self, slot)
+        if many and type(value) is list:
+            value = tuple(model(item) for item in value)
+            setattr(self, slot, value)
+        elif not many and type(value) is dict:
+            value = model(value)
+            setattr(self, slot, value)
+        return value
+    return property(getter)
+
+
+class ModelMeta(type):
+    """
+    Creates the slots of a model from its `fields`.
+
+    `fields` is a tuple of (attribute, key, kind) where kind is None for
+    plain values, `HASH` for hex encoded hashes, a model class for a
+    nested object or a list with a model class for a list of objects.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get('fields', ())
+        slots = list(namespace.get('__slots__', ()))
+        for attr, key, kind in fields:
+            if kind is None or kind == HASH:
+                slots.append(attr)
+            else:
+                slots.append('_' + attr)
+        namespace['__slots__'] = tuple(slots)
+        cls = super().__new__(mcs, name, bases, namespace)
+        for attr, key, kind in fields:
+            if kind is not None and kind != HASH:
+                setattr(cls, attr, _lazy_property('_' + attr, kind))
+        cls._keys = frozenset(key for _, key, _ in fields)
+        return cls
+
+
+class Model(metaclass=ModelMeta):
+    __slots__ = ('_extra',)
+    fields = ()
+
+    def __init__(self, data):
+        for attr, key, kind in self.fields:
+            value = data.get(key)
+            if kind is None:
+                setattr(self, attr, value)
+            elif kind == HASH:
+                setattr(self, attr,
+                        bytes.fromhex(value) if value else None)
+            else:
+                setattr(self, '_' + attr, value)
+        extra = {key: value for key, value in data.items()
+                 if key not in self._keys}
+        self._extra = extra or None
+
+    @property
+    def raw(self):
+        """
+        The response dict the object was created from.
+        """
+        raw = {}
+        for attr, key, kind in self.fields:
+            if kind is None:
+                value = getattr(self, attr)
+            elif kind == HASH:
+                value = getattr(self, attr)
+                value = value.hex() if value is not None else None
+            else:
+                value = getattr(self, '_' + attr)
+                if isinstance(value, tuple):
+                    value = [item.raw for item in value]
+                elif isinstance(value, Model):
+                    value = value.raw
+            if value is not None:
+                raw[key] = value
+        if self._extra:
+            raw.update(self._extra)
+        return raw
+
+    def __repr__(self):
+        attrs = []
+        for attr, _, kind in self.fields[:3]:
+            value = getattr(self, attr)
+            if kind == HASH and value is not None:
+                attrs.append(f'{attr}={value.hex()!r}')
+            elif kind is None:
+                attrs.append(f'{attr}={value!r}')
+        return f'{type(self).__name__}({", ".join(attrs)})'
+
+
+class BlockHeader(Model):
+    fields = (
+        ('height', 'height', None),
+        ('hash', 'hash', HASH),
+        ('prev_hash', 'prev_hash', HASH),
+        ('timestamp', 'timestamp', None),
+        ('difficulty', 'difficulty', None),
+        ('reward', 'reward', None),
+        ('depth', 'depth', None),
+        ('nonce', 'nonce', None),
+        ('major_version', 'major_version', None),
+        ('minor_version', 'minor_version', None),
+        ('orphan_status', 'orphan_status', None),
+        ('cumul_size', 'cumul_size', None),
+        ('tx_count', 'tx_count', None),
+    )
+
+
+class TransactionSummary(Model):
+    fields = (
+        ('hash', 'hash', HASH),
+        ('fee', 'fee', None),
+        ('amount_out', 'amount_out', None),
+        ('size', 'size', None),
+        ('mixin', 'mixin', None),
+        ('payment_id', 'paymentId', None),
+    )
+
+
+class Block(Model):
+    fields = BlockHeader.fields[:11] + (
+        ('already_generated_coins', 'alreadyGeneratedCoins', None),
+        ('already_generated_transactions', 'alreadyGeneratedTransactions',
+         None),
+        ('base_reward', 'baseReward', None),
+        ('block_size', 'blockSize', None),
+        ('effective_size_median', 'effectiveSizeMedian', None),
+        ('penalty', 'penalty', None),
+        ('size_median', 'sizeMedian', None),
+        ('total_fee_amount', 'totalFeeAmount', None),
+        ('transactions_cumulative_size', 'transactionsCumulativeSize', None),
+        ('transactions', 'transactions', [TransactionSummary]),
+    )
+
+
+class TransactionPrefix(Model):
+    fields = (
+        ('version', 'version', None),
+        ('unlock_time', 'unlock_time', None),
+        ('extra', 'extra', None),
+        ('vin', 'vin', None),
+        ('vout', 'vout', None),
+    )
+
+
+class Transaction(Model):
+    """
+    A transaction as returned by `TurtleCoind.get_transaction`.
+    """
+    fields = (
+        ('status', 'status', None),
+        ('details', 'txDetails', TransactionSummary),
+        ('block', 'block', BlockHeader),
+        ('prefix', 'tx', TransactionPrefix),
+    )
+
+    @property
+    def hash(self):
+        return self.details.hash
+
+
+class Transfer(Model):
+    fields = (
+        ('address', 'address', None),
+        ('amount', 'amount', None),
+        ('type', 'type', None),
+    )
+
+
+class WalletTransaction(Model):
+    """
+    A transaction as returned by `Walletd.get_transaction`.
+    """
+    fields = (
+        ('transaction_hash', 'transactionHash', HASH),
+        ('block_index', 'blockIndex', None),
+        ('timestamp', 'timestamp', None),
+        ('amount', 'amount', None),
+        ('fee', 'fee', None),
+        ('payment_id', 'paymentId', None),
+        ('is_base', 'isBase', None),
+        ('state', 'state', None),
+        ('unlock_time', 'unlockTime', None),
+        ('extra', 'extra', None),
+        ('transfers', 'transfers', [Transfer]),
+    )
+
+
+class Balance(Model):
+    fields = (
+        ('available_balance', 'availableBalance', None),
+        ('locked_amount', 'lockedAmount', None),
+    )
+
+
+class TypedClient:
+    """
+    Wraps a client and returns models instead of response dicts.
+
+    Methods without a model are passed through to the client unchanged.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class TypedTurtleCoind(TypedClient):
+
+    def get_last_block_header(self):
+        response = self.client.get_last_block_header()
+        return BlockHeader(response['result']['block_header'])
+
+    def get_block_header_by_hash(self, hash):
+        response = self.client.get_block_header_by_hash(hash)
+        return BlockHeader(response['result']['block_header'])
+
+    def get_block_header_by_height(self, height):
+        response = self.client.get_block_header_by_height(height)
+        return BlockHeader(response['result']['block_header'])
+
+    def get_blocks(self, height):
+        response = self.client.get_blocks(height)
+        return [BlockHeader(block) for block in response['result']['blocks']]
+
+    def iter_blocks(self, *args, **kwargs):
+        for block in self.client.iter_blocks(*args, **kwargs):
+            yield BlockHeader(block)
+
+    def get_block(self, block_hash):
+        response = self.client.get_block(block_hash)
+        return Block(response['result']['block'])
+
+    def get_transaction(self, transaction_hash):
+        response = self.client.get_transaction(transaction_hash)
+        return Transaction(response['result'])
+
+    def get_transaction_pool(self):
+        response = self.client.get_transaction_pool()
+        return [TransactionSummary(tx)
+                for tx in response['result']['transactions']]
+
+
+class TypedWalletd(TypedClient):
+
+    def get_balance(self, address=''):
+        return Balance(self.client.get_balance(address)['result'])
+
+    def get_transaction(self, transaction_hash):
+        result = self.client.get_transaction(transaction_hash)['result']
+        return WalletTransaction(result.get('transaction', result))
+
+    def get_transactions(self, addresses, block_hash, block_count,
+                         payment_id):
+        response = self.client.get_transactions(addresses, block_hash,
+                                                block_count, payment_id)
+        return [WalletTransaction(tx)
+                for item in response['result']['items']
+                for tx in item['transactions']]
+
+
+def typed(client):
+    """
+    Returns a view of `client` that returns models.
+
+    Args:
+        client (TurtleCoind or Walletd)
+
+    Returns:
+        TypedTurtleCoind or TypedWalletd
+
+    Raises:
+        TypeError: for other clients, including the asyncio clients
+    """
+    from .aio import AsyncClientMixin
+    from .turtlecoind import TurtleCoind
+    from .walletd import Walletd
+    if isinstance(client, AsyncClientMixin):
+        raise TypeError(f'typed views do not support asyncio clients, '
+                        f'got {client!r}')
+    if isinstance(client, TurtleCoind):
+        return TypedTurtleCoind(client)
+    if isinstance(client, Walletd):
+        return TypedWalletd(client)
+    raise TypeError(f'unsupported client {client!r}')
@@ -0,0 +1,196 @@
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+Payout = namedtuple('Payout', ['address', 'amount', 'payment_id', 'key'])
+Payout.__new__.__defaults__ = ('', None)
+Payout.__doc__ = """
+A withdrawal to send.
+
+Attributes:
+    address (str): receiving address
+    amount (int): amount in atomic units
+    payment_id (str): (optional) payment id
+    key: (optional) identifies the payout in the results
+"""
+
+PayoutResult = namedtuple('PayoutResult', ['payouts', 'transaction_hash',
+                                           'fee', 'error', 'unknown'])
+PayoutResult.__new__.__defaults__ = (False,)
+PayoutResult.__doc__ = """
+Result of one submitted transaction.
+
+Attributes:
+    payouts (list): the `Payout` items sent in the transaction
+    transaction_hash (str): hash of the transaction, None on error
+    fee (int): fee of the transaction
+    error: the error returned by walletd, or the exception if the request
+        failed without an answer, None on success
+    unknown (bool): True if it is unknown whether walletd sent the
+        transaction, e.g. after a connection error or timeout. These
+        payouts may have been sent and must not be retried blindly.
+"""
+
+
+class PayoutEngine:
+    """
+    Sends queued payouts in as few transactions as possible.
+
+    Payouts without payment id are packed into multi-recipient
+    transactions of up to `max_recipients` transfers. A payment id applies
+    to the whole transaction, so payouts with a payment id are only
+    grouped with payouts to the same payment id.
+
+    Example::
+
+        engine = PayoutEngine(wallet, change_address=hot_address)
+        engine.add('TRTL...', 1000)
+        engine.add('TRTL...', 2500, payment_id='7f3e...', key=withdrawal_id)
+
+        for result in engine.flush():
+            if result.error:
+                ...
+
+    Args:
+        wallet (Walletd): the sending wallet
+        max_recipients (int): maximum number of transfers per transaction
+        max_amount (int): (optional) maximum total amount per transaction
+        fee (int): fee per transaction
+        anonymity (int): mixin
+        change_address (str): change address, required if the wallet has
+            more than one address
+        workers (int): number of transactions submitted in parallel
+    """
+
+    def __init__(self, wallet, max_recipients=20, max_amount=None, fee=10,
+                 anonymity=3, change_address='', workers=1):
+        self.wallet = wallet
+        self.max_recipients = max_recipients
+        self.max_amount = max_amount
+        self.fee = fee
+        self.anonymity = anonymity
+        self.change_address = change_address
+        self.workers = workers
+        self.metrics = {'payouts': 0, 'transactions': 0, 'failed': 0,
+                        'unknown': 0, 'amount': 0, 'fees': 0,
+                        'seconds': 0.0}
+        self._queue = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, address, amount, payment_id='', key=None):
+        """
+        Queues a payout.
+        """
+        if amount <= 0:
+            raise ValueError('amount must be positive')
+        with self._lock:
+            self._queue.append(Payout(address, amount, payment_id, key))
+
+    def batches(self, payouts):
+        """
+        Groups payouts into the transactions they would be sent in.
+
+        Returns:
+            list: lists of `Payout` items, one per transaction
+        """
+        groups = {}
+        for payout in payouts:
+            groups.setdefault(payout.payment_id, []).append(payout)
+
+        batches = []
+        for group in groups.values():
+            batch = []
+            total = 0
+            for payout in group:
+                too_large = self.max_amount is not None and \
+                    total + payout.amount > self.max_amount
+                if batch and (len(batch) >= self.max_recipients or
+                              too_large):
+                    batches.append(batch)
+                    batch = []
+                    total = 0
+                batch.append(payout)
+                total += payout.amount
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def flush(self):
+        """
+        Sends all queued payouts.
+
+        Failed transactions are not retried, their payouts are returned
+        with the error. A batch whose request failed without an answer
+        from walletd is returned with `unknown` set, the other batches
+        are not affected.
+
+        Returns:
+            list: `PayoutResult` per transaction
+        """
+        with self._lock:
+            payouts, self._queue = self._queue, []
+        if not payouts:
+            return []
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._send, self.batches(payouts)))
+
+        self.metrics['seconds'] += time.monotonic() - started
+        for result in results:
+            if result.error is None:
+                self.metrics['transactions'] += 1
+                self.metrics['payouts'] += len(result.payouts)
+                self.metrics['amount'] += sum(p.amount
+                                              for p in result.payouts)
+                self.metrics['fees'] += result.fee
+            elif result.unknown:
+                self.metrics['unknown'] += 1
+            else:
+                self.metrics['failed'] += 1
+        return results
+
+    def stats(self):
+        """
+        Returns the metrics including payouts per second and the average
+        fee per payout.
+        """
+        stats = dict(self.metrics)
+        seconds = stats['seconds']
+        stats['payouts_per_second'] = \
+            stats['payouts'] / seconds if seconds else 0.0
+        stats['fee_per_payout'] = \
+            stats['fees'] / stats['payouts'] if stats['payouts'] else 0.0
+        return stats
+
+    def _send(self, batch):
+        transfers = [{'address': p.address, 'amount': p.amount}
+                     for p in batch]
+        try:
+            response = self.wallet.send_transaction(
+                transfers, anonymity=self.anonymity, fee=self.fee,
+                change_address=self.change_address,
+                payment_id=batch[0].payment_id)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # not an answer from walletd, e.g. an error page of a proxy
+            logger.error('sending %d payouts got an invalid response, '
+                         'unknown whether they were sent: %r', len(batch), e)
+            return PayoutResult(batch, None, self.fee, e, unknown=True)
+        except ValueError as e:
+            logger.warning('sending %d payouts failed: %s', len(batch), e)
+            return PayoutResult(batch, None, self.fee, e.args[0])
+        except Exception as e:
+            # the transaction may have been sent before the failure
+            logger.error('sending %d payouts failed, unknown whether they '
+                         'were sent: %r', len(batch), e)
+            return PayoutResult(batch, None, self.fee, e, unknown=True)
+        tx_hash = response['result']['transactionHash']
+        return PayoutResult(batch, tx_hash, self.fee, None)
@@ -0,0 +1,240 @@
+import logging
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .turtlecoind import TurtleCoind
+
+logger = logging.getLogger(__name__)
+
+# single-request methods available on the pool
+RPC_METHODS = frozenset([
+    'get_height', 'get_info', 'get_fee_info', 'get_block_count',
+    'get_block_hash', 'get_block_template', 'submit_block',
+    'get_last_block_header', 'get_block_header_by_hash',
+    'get_block_header_by_height', 'get_currency_id', 'get_blocks',
+    'get_block', 'get_transaction', 'get_transactions',
+    'get_transaction_pool', 'get_peers',
+])
+
+# methods that must not be retried on another node
+NON_IDEMPOTENT = frozenset(['submit_block'])
+
+# reads that can be sent to two nodes at once
+HEDGED_METHODS = frozenset([
+    'get_height', 'get_info', 'get_fee_info', 'get_block_count',
+    'get_block_hash', 'get_last_block_header', 'get_block_header_by_hash',
+    'get_block_header_by_height', 'get_currency_id', 'get_blocks',
+    'get_block', 'get_transaction', 'get_transaction_pool',
+])
+
+# share of requests sent to a random node regardless of its latency
+EXPLORE_RATE = 0.05
+
+
+class NodeStats:
+    """
+    Health and performance of one node of a `TurtleCoindPool`.
+
+    Attributes:
+        latency (float): moving average of the request latency in seconds
+        requests (int): number of requests
+        errors (int): number of failed requests
+        in_flight (int): number of running requests
+        height (int): height at the last health check
+        healthy (bool): result of the last health check
+    """
+
+    def __init__(self):
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.height = None
+        self.healthy = True
+
+    def record(self, seconds, alpha=0.2):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += alpha * (seconds - self.latency)
+
+    def load(self):
+        return (self.latency or 0.001) * (self.in_flight + 1)
+
+    def as_dict(self):
+        return {'latency': self.latency, 'requests': self.requests,
+                'errors': self.errors, 'in_flight': self.in_flight,
+                'height': self.height, 'healthy': self.healthy}
+
+
+class TurtleCoindPool:
+    """
+    Routes `TurtleCoind` requests over several daemons.
+
+    The nodes are health-checked with `get_info` every `check_interval`
+    seconds. A node is healthy if it reports being synced, and is at most
+    `max_lag` blocks behind its `network_height` and behind the median
+    height of all nodes. Every request goes to the less loaded of two
+    random healthy nodes, where the load is the average latency times the
+    number of running requests, so fast nodes get more requests and all
+    nodes share the load. Failed reads are retried on the next node.
+
+    With a `hedger` (see :class:`turtlecoin.hedging.Hedger`) slow reads
+    are sent to a second node as well and the first answer is used.
+
+    The single-request methods of `TurtleCoind` (see `RPC_METHODS`) are
+    available on the pool. Methods sending several requests, like
+    `batch` or `iter_blocks`, are not, use them on one of `nodes`::
+
+        pool = TurtleCoindPool([('10.0.0.1', 11898), ('10.0.0.2', 11898)])
+        pool.get_block_count()
+        pool.stats()
+
+    Args:
+        nodes (list): `TurtleCoind` instances or (host, port) tuples
+        max_lag (int): number of blocks a node may be behind
+        check_interval (float): seconds between health checks
+        retries (int): number of other nodes to try if a read fails
+        hedger (Hedger): (optional) hedges reads over two nodes
+    """
+
+    def __init__(self, nodes, max_lag=2, check_interval=30, retries=2,
+                 hedger=None):
+        self.nodes = [node if isinstance(node, TurtleCoind)
+                      else TurtleCoind(*node) for node in nodes]
+        if not self.nodes:
+            raise ValueError('at least one node is required')
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retries = retries
+        self.hedger = hedger
+        self._stats = {node: NodeStats() for node in self.nodes}
+        self._last_check = 0
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name not in RPC_METHODS:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._call(name, args, kwargs)
+        call.__name__ = name
+        return call
+
+    def check(self):
+        """
+        Health-checks all nodes.
+        """
+        def info(node):
+            try:
+                return node.get_info()
+            except (requests.RequestException, ValueError) as e:
+                logger.warning('health check of %s failed: %s', node.url, e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as executor:
+            infos = list(executor.map(info, self.nodes))
+
+        heights = [i['height'] for i in infos if i is not None]
+        majority = statistics.median_low(heights) if heights else 0
+        with self._lock:
+            for node, i in zip(self.nodes, infos):
+                stats = self._stats[node]
+                if i is None:
+                    stats.healthy = False
+                    continue
+                stats.height = i['height']
+                stats.healthy = (
+                    i.get('synced', True) and
+                    i['height'] >= i['network_height'] - self.max_lag and
+                    i['height'] >= majority - self.max_lag)
+            self._last_check = time.monotonic()
+
+    def healthy_nodes(self):
+        """
+        Returns the nodes that passed the last health check.
+        """
+        self._check_if_due()
+        with self._lock:
+            return [n for n in self.nodes if self._stats[n].healthy]
+
+    def stats(self):
+        """
+        Returns the `NodeStats` of every node as dict, keyed by url.
+        """
+        with self._lock:
+            return {node.url: self._stats[node].as_dict()
+                    for node in self.nodes}
+
+    def _check_if_due(self):
+        if time.monotonic() - self._last_check < self.check_interval:
+            return
+        # only one thread runs the check, the others keep the old state
+        if self._check_lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._check_lock.release()
+
+    def _pick(self, exclude):
+        candidates = [n for n in self.healthy_nodes() if n not in exclude]
+        if not candidates:
+            # no healthy node left, fall back to any node
+            candidates = [n for n in self.nodes if n not in exclude]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        if random.random() < EXPLORE_RATE:
+            # keep the latency of slower nodes up to date
+            return random.choice(candidates)
+        a, b = random.sample(candidates, 2)
+        with self._lock:
+            return a if self._stats[a].load() <= self._stats[b].load() else b
+
+    def _call(self, name, args, kwargs):
+        if self.hedger is not None and name in HEDGED_METHODS:
+            first = self._pick([])
+            second = self._pick([first])
+            if second is not None:
+                return self.hedger.run(
+                    name,
+                    lambda: self._call_node(first, name, args, kwargs),
+                    lambda: self._call_node(second, name, args, kwargs))
+
+        attempts = 1 if name in NON_IDEMPOTENT else self.retries + 1
+        tried = []
+        while True:
+            node = self._pick(tried)
+            tried.append(node)
+            try:
+                return self._call_node(node, name, args, kwargs)
+            except requests.RequestException:
+                if len(tried) >= min(attempts, len(self.nodes)):
+                    raise
+
+    def _call_node(self, node, name, args, kwargs):
+        stats = self._stats[node]
+        with self._lock:
+            stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result = getattr(node, name)(*args, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                stats.errors += 1
+                stats.healthy = False
+            raise
+        finally:
+            with self._lock:
+                stats.in_flight -= 1
+                stats.requests += 1
+        with self._lock:
+            stats.record(time.perf_counter() - started)
+        return result
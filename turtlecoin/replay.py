@@ -0,0 +1,287 @@
+"""
+Record the requests of a client and replay them later.
+
+`Recorder` appends every request and response of the clients it is
+attached to to a file, one JSON array per line::
+
+    [timestamp, seconds, verb, path, request, response, error]
+
+Walletd passwords, the secret keys sent to walletd (see
+`SECRET_PARAMS`) and the responses of the methods returning keys or
+seeds (see `SECRET_METHODS`) are recorded as null. The other requests
+and responses are stored as they are, including addresses, balances and
+transactions, so treat recordings as sensitive. Files ending in ``.gz``
+are gzip compressed. `Replayer` sends the recorded requests to another server,
+either with the original timing or as fast as possible::
+
+    recorder = Recorder('traffic.jsonl.gz')
+    recorder.attach(daemon)
+    ...
+    recorder.close()
+
+    Replayer('traffic.jsonl.gz', 'http://127.0.0.1:11898', speed=None).run()
+
+Or from the command line::
+
+    $ python -m turtlecoin.replay traffic.jsonl.gz http://127.0.0.1:11898
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .client import _error_code, _method_name, create_session
+from .codec import JSONCodec
+from .instrumentation import CallInfo, LatencyRecorder
+
+# walletd request parameters holding secret keys
+SECRET_PARAMS = frozenset({'spendSecretKey', 'spendSecretKeys',
+                           'viewSecretKey'})
+# walletd methods whose responses hold secret keys or seeds
+SECRET_METHODS = frozenset({'getSpendKeys', 'getViewKey',
+                            'getMnemonicSeed'})
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def read_records(path):
+    """
+    Yields the recorded exchanges of `path` as tuples of (timestamp,
+    seconds, verb, path, request, response, error).
+    """
+    with _open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield tuple(json.loads(line))
+
+
+class Recorder:
+    """
+    Appends the requests of clients to a file.
+
+    Args:
+        path (str): file to append to, gzip compressed if it ends in .gz
+        responses (bool): also record the responses, needed to verify a
+            replay
+    """
+
+    def __init__(self, path, responses=True):
+        self.path = path
+        self.responses = responses
+        self.count = 0
+        self._codec = JSONCodec()
+        self._file = _open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def attach(self, client):
+        """
+        Records all requests of `client` until `detach` is called.
+        """
+        send, get = client._send, client._get
+
+        def recorded_send(url, payload):
+            return self._exchange('POST', url, payload,
+                                  lambda: send(url, payload))
+
+        def recorded_get(url):
+            return self._exchange('GET', url, None, lambda: get(url))
+
+        client._send = recorded_send
+        client._get = recorded_get
+
+    def detach(self, client):
+        del client._send
+        del client._get
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _exchange(self, verb, url, payload, send):
+        timestamp = time.time()
+        started = time.perf_counter()
+        response = error = None
+        try:
+            response = send()
+            error = _error_code(response)
+            return response
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._write([round(timestamp, 6),
+                         round(time.perf_counter() - started, 6), verb,
+                         urlsplit(url).path, _redacted(payload),
+                         response if self.responses and
+                         not _returns_secrets(payload) else None, error])
+
+    def _write(self, record):
+        line = self._codec.encode(record) + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+
+
+def _redacted(payload):
+    if isinstance(payload, list):
+        return [_redacted(p) for p in payload]
+    if not isinstance(payload, dict):
+        return payload
+    if 'password' in payload:
+        payload = dict(payload, password=None)
+    params = payload.get('params')
+    if isinstance(params, dict) and not SECRET_PARAMS.isdisjoint(params):
+        payload = dict(payload, params={
+            name: None if name in SECRET_PARAMS else value
+            for name, value in params.items()})
+    return payload
+
+
+def _returns_secrets(payload):
+    if isinstance(payload, list):
+        return any(_returns_secrets(p) for p in payload)
+    return isinstance(payload, dict) and \
+        payload.get('method') in SECRET_METHODS
+
+
+class Replayer:
+    """
+    Sends recorded requests to a server.
+
+    Args:
+        path (str): recording made by `Recorder`
+        url (str): base url of the server, e.g. 'http://127.0.0.1:11898'
+        speed (float): 1 keeps the original timing, 2 replays twice as
+            fast, None sends the requests as fast as possible
+        workers (int): maximum number of concurrent requests
+        password (str): walletd password put into requests that had one
+        verify (bool): compare the responses with the recorded ones
+        codec: (optional) codec to encode and decode with
+    """
+
+    def __init__(self, path, url, speed=1.0, workers=16, password=None,
+                 verify=False, codec=None):
+        self.path = path
+        self.url = url.rstrip('/')
+        self.speed = speed
+        self.workers = workers
+        self.password = password
+        self.verify = verify
+        self.codec = codec if codec is not None else JSONCodec()
+        self.latencies = LatencyRecorder()
+        self.mismatches = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        """
+        Replays the recording and waits for all requests to finish.
+
+        Returns:
+            dict: number of requests, failed requests (no response),
+            mismatching responses, wall time, the largest delay behind
+            schedule in seconds and the latency summary per method
+        """
+        session = create_session(pool_maxsize=self.workers, pool_block=True)
+        count = 0
+        max_lag = 0.0
+        first = None
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for record in read_records(self.path):
+                timestamp = record[0]
+                if first is None:
+                    first = timestamp
+                if self.speed:
+                    due = started + (timestamp - first) / self.speed
+                    wait = due - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                    else:
+                        max_lag = max(max_lag, -wait)
+                executor.submit(self._replay, session, record)
+                count += 1
+        session.close()
+        return {'requests': count,
+                'failures': self.failures,
+                'mismatches': self.mismatches,
+                'seconds': time.perf_counter() - started,
+                'max_lag': max_lag,
+                'latency': self.latencies.summary()}
+
+    def _replay(self, session, record):
+        _, _, verb, path, request, expected, _ = record
+        url = self.url + path
+        started = time.perf_counter()
+        status = size = response = error = None
+        try:
+            if verb == 'GET':
+                method = path.rsplit('/', 1)[-1]
+                data = b''
+                r = session.get(url)
+            else:
+                request = self._with_password(request)
+                method = _method_name(request)
+                data = self.codec.encode(request)
+                r = session.post(url, data=data,
+                                 headers={'content-type': 'application/json'})
+            status, size = r.status_code, len(r.content)
+            response = self.codec.decode(r.content)
+            error = _error_code(response)
+        except Exception as e:
+            error = type(e).__name__
+            with self._lock:
+                self.failures += 1
+        self.latencies(CallInfo(method, url, time.perf_counter() - started,
+                                len(data), size, status, error))
+        if self.verify and expected is not None and response != expected:
+            with self._lock:
+                self.mismatches += 1
+
+    def _with_password(self, payload):
+        if isinstance(payload, list):
+            return [self._with_password(p) for p in payload]
+        if isinstance(payload, dict) and 'password' in payload:
+            return dict(payload, password=self.password)
+        return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replays requests recorded with turtlecoin.replay.')
+    parser.add_argument('path')
+    parser.add_argument('url')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed, 1 is the original timing')
+    parser.add_argument('--fast', action='store_true',
+                        help='send the requests as fast as possible')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--password')
+    parser.add_argument('--verify', action='store_true',
+                        help='compare the responses with the recording')
+    args = parser.parse_args()
+
+    replayer = Replayer(args.path, args.url,
+                        speed=None if args.fast else args.speed,
+                        workers=args.workers, password=args.password,
+                        verify=args.verify)
+    print(json.dumps(replayer.run(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
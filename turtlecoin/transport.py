@@ -0,0 +1,334 @@
+"""
+Minimal HTTP/1.1 transport over persistent sockets.
+
+`SocketSession` can be passed as `session` to any client instead of the
+default `requests` session. It skips most of the work the generic HTTP
+stack does per request::
+
+    from turtlecoin.transport import SocketSession
+
+    daemon = TurtleCoind(session=SocketSession(pool_maxsize=4))
+
+Only plain http is supported. Connection errors and timeouts are raised as
+the `requests` exceptions the default session raises.
+"""
+
+import select
+import socket
+import threading
+import zlib
+from urllib.parse import urlsplit
+
+import requests
+
+
+class Response:
+    """
+    The parts of a `requests.Response` the clients use.
+    """
+
+    __slots__ = ('status_code', 'headers', 'content')
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class Connection:
+    """
+    One keep-alive socket with a reusable receive buffer.
+    """
+
+    def __init__(self, host, port, timeout=None, buffer_size=65536):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray(buffer_size)
+        # received but not yet parsed data is buffer[start:end]
+        self.start = 0
+        self.end = 0
+
+    def close(self):
+        self.sock.close()
+
+    def is_dropped(self):
+        """
+        Returns True if the server closed the idle connection.
+        """
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        # an idle connection only becomes readable when it is closed
+        return bool(readable)
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def _fill(self):
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buffer):
+            if self.start:
+                size = self.end - self.start
+                self.buffer[:size] = self.buffer[self.start:self.end]
+                self.start, self.end = 0, size
+            else:
+                self.buffer.extend(bytes(len(self.buffer)))
+        with memoryview(self.buffer) as view:
+            received = self.sock.recv_into(view[self.end:])
+        if not received:
+            raise ConnectionError('connection closed by server')
+        self.end += received
+
+    def _read_line(self):
+        while True:
+            index = self.buffer.find(b'\r\n', self.start, self.end)
+            if index >= 0:
+                line = bytes(self.buffer[self.start:index])
+                self.start = index + 2
+                return line
+            self._fill()
+
+    def _read(self, size):
+        while self.end - self.start < size:
+            self._fill()
+        data = bytes(self.buffer[self.start:self.start + size])
+        self.start += size
+        return data
+
+    def _read_until_close(self):
+        chunks = []
+        while True:
+            chunks.append(bytes(self.buffer[self.start:self.end]))
+            self.start = self.end
+            try:
+                self._fill()
+            except ConnectionError:
+                return b''.join(chunks)
+
+    def read_response(self):
+        """
+        Reads one response.
+
+        Returns:
+            tuple: the `Response` and whether the connection can be reused
+        """
+        status_line = self._read_line()
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = self._read_line()
+            if not line:
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (version == b'HTTP/1.1' and
+                      headers.get('connection', '').lower() != 'close')
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = self._read_chunked()
+        elif 'content-length' in headers:
+            content = self._read(int(headers['content-length']))
+        else:
+            content = self._read_until_close()
+            keep_alive = False
+
+        encoding = headers.get('content-encoding')
+        if encoding == 'gzip':
+            content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            content = zlib.decompress(content)
+        return Response(int(status), headers, content), keep_alive
+
+    def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int(self._read_line().split(b';', 1)[0], 16)
+            if not size:
+                break
+            chunks.append(self._read(size))
+            self._read_line()
+        # skip the trailer
+        while self._read_line():
+            pass
+        return b''.join(chunks)
+
+
+class SocketSession:
+    """
+    Sends requests over a small pool of persistent HTTP/1.1 sockets.
+
+    Each socket keeps its receive buffer between requests and the request
+    line and headers are built once per url. `pipeline` sends several
+    requests before reading the responses if the server keeps the
+    connection open while doing so.
+
+    Args:
+        pool_maxsize (int): maximum number of idle sockets kept per host
+        timeout (float): (optional) socket timeout in seconds
+        gzip (bool): ask the server for gzip compressed responses
+        buffer_size (int): initial size of the receive buffers
+        pipeline_depth (int): maximum number of requests in flight on
+            one socket when pipelining
+    """
+
+    def __init__(self, pool_maxsize=4, timeout=None, gzip=False,
+                 buffer_size=65536, pipeline_depth=16):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.gzip = gzip
+        self.buffer_size = buffer_size
+        self.pipeline_depth = pipeline_depth
+        # False for hosts known to close pipelined connections
+        self.pipelining = {}
+        self._idle = {}
+        self._targets = {}
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Closes all idle sockets.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def post(self, url, data=b'', headers=None):
+        return self._request(url, self._post_head(url, data, headers) + data)
+
+    def get(self, url, headers=None):
+        return self._request(url, self._head('GET', url, headers) + b'\r\n')
+
+    def pipeline(self, url, bodies, headers=None):
+        """
+        POSTs every body in `bodies` to `url`.
+
+        The requests are written to one socket in groups of
+        `pipeline_depth` before the responses are read. If the server
+        closes the connection before answering all of them, the host is
+        not pipelined to anymore and the unanswered requests are sent
+        again one by one, so only pipeline idempotent requests.
+
+        Returns:
+            list: a `Response` per body, in the same order
+        """
+        messages = [self._post_head(url, data, headers) + data
+                    for data in bodies]
+        host = self._target(url)[0]
+        responses = []
+        while len(responses) < len(messages) and \
+                self.pipelining.get(host, True):
+            window = messages[len(responses):
+                              len(responses) + self.pipeline_depth]
+            answered = self._pipelined(host, window)
+            responses.extend(answered)
+            if len(answered) < len(window):
+                self.pipelining[host] = False
+        for message in messages[len(responses):]:
+            responses.append(self._request(url, message))
+        return responses
+
+    def _target(self, url):
+        target = self._targets.get(url)
+        if target is None:
+            parts = urlsplit(url)
+            if parts.scheme != 'http':
+                raise ValueError(f'unsupported url {url!r}, only http is '
+                                 f'supported')
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            host = (parts.hostname, parts.port or 80)
+            target = self._targets[url] = (host, path)
+        return target
+
+    def _head(self, verb, url, headers):
+        key = (verb, url, tuple(headers.items()) if headers else ())
+        head = self._prefixes.get(key)
+        if head is None:
+            (hostname, port), path = self._target(url)
+            lines = [f'{verb} {path} HTTP/1.1', f'Host: {hostname}:{port}']
+            if self.gzip:
+                lines.append('Accept-Encoding: gzip')
+            for name, value in (headers or {}).items():
+                lines.append(f'{name}: {value}')
+            head = self._prefixes[key] = (
+                '\r\n'.join(lines) + '\r\n').encode('latin-1')
+        return head
+
+    def _post_head(self, url, data, headers):
+        return (self._head('POST', url, headers) +
+                b'Content-Length: %d\r\n\r\n' % len(data))
+
+    def _acquire(self, host):
+        with self._lock:
+            idle = self._idle.get(host)
+            while idle:
+                connection = idle.pop()
+                if not connection.is_dropped():
+                    return connection
+                connection.close()
+        try:
+            return Connection(host[0], host[1], self.timeout,
+                              self.buffer_size)
+        except socket.timeout as e:
+            raise requests.ConnectTimeout(e)
+        except OSError as e:
+            raise requests.ConnectionError(e)
+
+    def _release(self, host, connection):
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self.pool_maxsize:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _request(self, url, request):
+        host = self._target(url)[0]
+        connection = self._acquire(host)
+        try:
+            connection.send(request)
+            response, keep_alive = connection.read_response()
+        except socket.timeout as e:
+            connection.close()
+            raise requests.ReadTimeout(e)
+        except (OSError, ValueError) as e:
+            connection.close()
+            raise requests.ConnectionError(e)
+        if keep_alive:
+            self._release(host, connection)
+        else:
+            connection.close()
+        return response
+
+    def _pipelined(self, host, window):
+        connection = self._acquire(host)
+        responses = []
+        keep_alive = True
+        try:
+            connection.send(b''.join(window))
+            while keep_alive and len(responses) < len(window):
+                response, keep_alive = connection.read_response()
+                responses.append(response)
+        except socket.timeout as e:
+            connection.close()
+            raise requests.ReadTimeout(e)
+        except (OSError, ValueError):
+            # answered responses are kept, the rest is sent again
+            keep_alive = False
+        if keep_alive:
+            self._release(host, connection)
+        else:
+            connection.close()
+        return responses
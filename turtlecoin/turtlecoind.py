@@ -1,17 +1,95 @@
-import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-import json
+from .client import JSONRPCClient
+from .hedging import IDEMPOTENT_METHODS
+from .txcache import TransactionCache
 
+# number of blocks returned by f_blocks_list_json
+BLOCKS_PER_REQUEST = 30
 
-class TurtleCoind:
+
+def _describe_header(response):
+    header = response['result']['block_header']
+    return header['height'], header['hash'], header['prev_hash']
+
+
+def _describe_block(response):
+    block = response['result']['block']
+    return block['height'], block['hash'], block['prev_hash']
+
+
+def _transaction_block_index(response):
+    # unconfirmed transactions come with a block without hash
+    block = response['result'].get('block')
+    if not block or not block.get('hash'):
+        return None
+    return block.get('height')
+
+
+def _batch_payload(calls):
+    return [{'jsonrpc': '2.0', 'id': i, 'method': method,
+             'params': params or {}}
+            for i, (method, params) in enumerate(calls)]
+
+
+def _batch_results(calls, response):
+    if not isinstance(response, list):
+        return None
+
+    by_id = {r.get('id'): r for r in response if isinstance(r, dict)}
+    results = []
+    for i, (method, _) in enumerate(calls):
+        r = by_id.get(i)
+        if r is None:
+            r = ValueError({'message': f'no response for {method}'})
+        elif 'error' in r:
+            r = ValueError(r['error'])
+        results.append(r)
+    return results
+
+
+class TurtleCoind(JSONRPCClient):
     """
     Integrates with JSON-RPC interface of `TurtleCoind`.
+
+    All requests go through a pooled keep-alive HTTP session. Pass
+    `session` (see :func:`turtlecoin.create_session`) to share one
+    connection pool between several clients, or a
+    :class:`~turtlecoin.transport.SocketSession` for lower per-request
+    overhead.
+
+    Block headers, blocks and block hashes are cached if a `cache` is
+    given::
+
+        from turtlecoin.cache import BlockCache, SqliteCache
+
+        daemon = TurtleCoind(cache=BlockCache(SqliteCache('blocks.db')))
+
+    Slow idempotent reads are sent a second time over another connection
+    if a `hedger` (see :class:`turtlecoin.hedging.Hedger`) is given.
+    `submit_block` and `get_block_template` are never hedged.
+
+    `get_transactions_bulk` keeps deeply confirmed transactions in
+    `transaction_cache` (see :class:`turtlecoin.txcache.TransactionCache`).
     """
 
-    def __init__(self, host='127.0.0.1', port=11898):
-        self.url = f'http://{host}:{port}'
-        self.headers = {'content-type': 'application/json'}
+    def __init__(self, host='127.0.0.1', port=11898, session=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 batch_size=100, cache=None, codec=None, coalesce=False,
+                 ttl=None, hedger=None, transaction_cache=None):
+        super().__init__(f'http://{host}:{port}', session=session,
+                         pool_connections=pool_connections,
+                         pool_maxsize=pool_maxsize,
+                         pool_block=pool_block, codec=codec,
+                         coalesce=coalesce, ttl=ttl)
+        self.batch_size = batch_size
+        self.batch_supported = True
+        self.cache = cache
+        self.hedger = hedger
+        if transaction_cache is None:
+            transaction_cache = TransactionCache()
+        self.transaction_cache = transaction_cache
 
     def _make_request(self, method, **kwargs):
         post_url = self.url +'/json_rpc'
@@ -20,19 +98,96 @@ class TurtleCoind:
             'method': method,
             'params': kwargs,
         }
-        logging.debug(json.dumps(payload, indent=4))
-        response = requests.post(post_url,
-                                 data=json.dumps(payload),
-                                 headers=self.headers).json()
-        if 'error' in response:
-            raise ValueError(response['error'])
-        return response
+        return self._post(post_url, payload)
+
+    def _post(self, url, payload):
+        method = payload.get('method')
+        if self.hedger is not None and method in IDEMPOTENT_METHODS:
+            def send():
+                return super(TurtleCoind, self)._post(url, payload)
+            return self.hedger.run(method, send, send)
+        return super()._post(url, payload)
 
     def _make_get_request(self, method):
         get_url = self.url + '/' + method
-        print(get_url)
-        response = requests.get(get_url)
-        return response.json()
+        return self._get(get_url)
+
+    def _cached(self, key, fetch, describe):
+        if self.cache is None:
+            return fetch()
+        return self.cache.lookup(key, fetch, describe,
+                                 self.get_last_block_header)
+
+    def batch(self, calls, batch_size=None):
+        """
+        Sends many JSON-RPC calls using as few HTTP requests as possible
+
+        The calls are split into chunks of `batch_size` and each chunk is
+        sent as one JSON-RPC 2.0 batch. If the daemon rejects batches the
+        client remembers it and sends the calls as individual requests
+        over the connection pool instead, pipelined if the session is a
+        :class:`~turtlecoin.transport.SocketSession` and all calls are
+        idempotent reads.
+
+        Args:
+            calls (list): (method, params) tuples, e.g.
+                ``[('getblockheaderbyheight', {'height': 1}), ...]``
+            batch_size (int): (optional) number of calls per HTTP request
+
+        Returns:
+            list: one response per call, in the order of `calls`. The
+            response has the same format as the single method call. A
+            call that failed is returned as a `ValueError` instance
+            holding the error instead of raising it.
+        """
+        batch_size = batch_size or self.batch_size
+        results = []
+        for i in range(0, len(calls), batch_size):
+            chunk = calls[i:i + batch_size]
+            if self.batch_supported:
+                responses = self._send_batch(chunk)
+                if responses is not None:
+                    results.extend(responses)
+                    continue
+                self.batch_supported = False
+            results.extend(self._send_pipelined(chunk))
+        return results
+
+    def _send_batch(self, calls):
+        try:
+            response = self._send(self.url + '/json_rpc',
+                                  _batch_payload(calls))
+        except ValueError:
+            return None
+        return _batch_results(calls, response)
+
+    def _send_pipelined(self, calls):
+        pipeline = getattr(self.session, 'pipeline', None)
+        if (pipeline is not None and not self._hooks and
+                all(method in IDEMPOTENT_METHODS for method, _ in calls)):
+            payloads = [{'jsonrpc': '2.0', 'method': method,
+                         'params': params or {}} for method, params in calls]
+            responses = pipeline(self.url + '/json_rpc',
+                                 [self._encode(p) for p in payloads],
+                                 self.headers)
+            results = []
+            for response in responses:
+                response = self.codec.decode(response.content)
+                if 'error' in response:
+                    response = ValueError(response['error'])
+                results.append(response)
+            return results
+
+        def call(method_params):
+            method, params = method_params
+            try:
+                return self._make_request(method, **(params or {}))
+            except ValueError as e:
+                return e
+
+        workers = self._pool_options['pool_maxsize']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, calls))
 
     def get_height(self):
         """
@@ -47,7 +202,9 @@ class TurtleCoind:
                     'status': 'OK'
                 }
         """
-        return self._make_get_request('getheight')
+        return self._coalesced('getheight',
+                               lambda: self._make_get_request('getheight'),
+                               lambda r: r['height'])
 
     def get_info(self):
         """
@@ -85,7 +242,9 @@ class TurtleCoind:
                     'white_peerlist_size': 52
                 }
         """
-        return self._make_get_request('getinfo')
+        return self._coalesced('getinfo',
+                               lambda: self._make_get_request('getinfo'),
+                               lambda r: r['height'])
 
     def get_transactions(self):
         """
@@ -130,7 +289,8 @@ class TurtleCoind:
                     'status': "Node's fee address is not set"
                 }
         """
-        return self._make_get_request('feeinfo')
+        return self._coalesced('feeinfo',
+                               lambda: self._make_get_request('feeinfo'))
 
     def get_block_count(self):
         """
@@ -147,7 +307,9 @@ class TurtleCoind:
                 }
             }
         """
-        return self._make_request('getblockcount')
+        return self._coalesced('getblockcount',
+                               lambda: self._make_request('getblockcount'),
+                               lambda r: r['result']['count'])
     
     def get_block_hash(self, block_hash):
         """
@@ -169,12 +331,9 @@ class TurtleCoind:
             'method': 'on_getblockhash',
             'params': [block_hash]
         }
-        response = requests.post(self.url,
-                                 data=json.dumps(payload),
-                                 headers=self.headers).json()
-        if 'error' in response:
-            raise ValueError(response['error'])
-        return response
+        return self._cached(f'hash:{block_hash}',
+                            lambda: self._post(self.url, payload),
+                            lambda r: (block_hash - 1, r['result'], None))
 
     def get_block_template(self, reserve_size, wallet_address):
         """
@@ -221,12 +380,7 @@ class TurtleCoind:
             'method': 'submitblock',
             'params': [block_blob]
         }
-        response = requests.post(self.url,
-                                 data=json.dumps(payload),
-                                 headers=self.headers).json()
-        if 'error' in response:
-            raise ValueError(response['error'])
-        return response
+        return self._post(self.url, payload)
 
     def get_last_block_header(self):
         """
@@ -265,7 +419,10 @@ class TurtleCoind:
             dict: See getlastblockheader
         """
         params = {'hash': hash}
-        return self._make_request('getblockheaderbyhash', **params)
+        return self._cached(
+            f'header:{hash}',
+            lambda: self._make_request('getblockheaderbyhash', **params),
+            _describe_header)
 
     def get_block_header_by_height(self, height):
         """
@@ -278,7 +435,24 @@ class TurtleCoind:
             dict: See getlastblockheader
         """
         params = {'height': height}
-        return self._make_request('getblockheaderbyheight', **params)
+        return self._cached(
+            f'header:{height}',
+            lambda: self._make_request('getblockheaderbyheight', **params),
+            _describe_header)
+
+    def get_block_headers_by_height(self, heights):
+        """
+        Returns the block headers for many heights, batching the requests.
+
+        Args:
+            heights (list): block heights
+
+        Returns:
+            list: See getlastblockheader, one entry per height. Failed
+            lookups are returned as `ValueError` instances.
+        """
+        return self.batch([('getblockheaderbyheight', {'height': height})
+                           for height in heights])
 
     def get_currency_id(self):
         """
@@ -323,6 +497,51 @@ class TurtleCoind:
         params = {'height': height}
         return self._make_request('f_blocks_list_json', **params)
 
+    def iter_blocks(self, start=0, end=None, workers=4, prefetch=8):
+        """
+        Yields the blocks from `start` to `end` (inclusive) in height order
+
+        The range is split into the 30 block windows returned by
+        `get_blocks` which are fetched concurrently. At most `prefetch`
+        windows are held in memory at any time. To resume an interrupted
+        scan pass the height after the last processed block as `start`.
+
+        Args:
+            start (int): height of the first block
+            end (int): (optional) height of the last block, defaults to
+                the current top block
+            workers (int): number of concurrent requests
+            prefetch (int): number of windows fetched ahead
+
+        Yields:
+            dict: block entries as returned in `get_blocks`
+        """
+        if end is None:
+            end = self.get_block_count()['result']['count'] - 1
+        tops = iter(range(min(start + BLOCKS_PER_REQUEST - 1, end),
+                          end + BLOCKS_PER_REQUEST,
+                          BLOCKS_PER_REQUEST))
+        next_height = start
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+
+            def fetch_next():
+                top = next(tops, None)
+                if top is not None:
+                    pending.append(
+                        executor.submit(self.get_blocks, min(top, end)))
+
+            for _ in range(max(prefetch, 1)):
+                fetch_next()
+            while pending:
+                blocks = pending.popleft().result()['result']['blocks']
+                fetch_next()
+                for block in sorted(blocks, key=lambda b: b['height']):
+                    if next_height <= block['height'] <= end:
+                        # windows can overlap at the end of the range
+                        next_height = block['height'] + 1
+                        yield block
+
     def get_block(self, block_hash):
         """
         Returns information on a single block
@@ -370,7 +589,10 @@ class TurtleCoind:
             }
         """
         params = {'hash': block_hash}
-        return self._make_request('f_block_json', **params)
+        return self._cached(
+            f'block:{block_hash}',
+            lambda: self._make_request('f_block_json', **params),
+            _describe_block)
     
     def get_transaction(self, transaction_hash):
         """
@@ -431,6 +653,25 @@ class TurtleCoind:
         params = {'hash' : transaction_hash}
         return self._make_request('f_transaction_json', **params)
 
+    def get_transactions_bulk(self, hashes, workers=8):
+        """
+        Gets many transactions, see `get_transaction`
+
+        Transactions found in `transaction_cache` are not requested again,
+        the others are fetched with up to `workers` concurrent requests.
+
+        Args:
+            hashes (list): transaction hashes
+            workers (int): maximum number of concurrent requests
+
+        Returns:
+            list: one response per hash, in the order of `hashes`. A
+            lookup that failed is returned as a `ValueError` instance.
+        """
+        return self.transaction_cache.bulk(
+            hashes, self.get_transaction, _transaction_block_index,
+            lambda: self.get_block_count()['result']['count'], workers)
+
     def get_transaction_pool(self):
         """
         Gets the list of transaction hashs in the mempool.
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import LRUCache
+
+
+class TransactionCache:
+    """
+    Size-bounded cache of deeply confirmed transactions.
+
+    The content of a transaction never changes once it is buried deep
+    enough, so transactions are only cached after `confirmations` blocks.
+    Used by `get_transactions_bulk` of `TurtleCoind` and `Walletd`.
+
+    Note:
+        Callers receive the cached response objects, they should not be
+        modified.
+
+    Args:
+        maxsize (int): number of transactions kept in memory
+        confirmations (int): number of confirmations needed before a
+            transaction is cached
+        backend: (optional) `LRUCache` or `SqliteCache` to store the
+            transactions in, defaults to an `LRUCache` of `maxsize`
+    """
+
+    def __init__(self, maxsize=100000, confirmations=60, backend=None):
+        self.confirmations = confirmations
+        self.backend = backend if backend is not None else LRUCache(maxsize)
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def bulk(self, hashes, fetch, block_index_of, block_count, workers=8):
+        """
+        Returns the transactions of `hashes`, fetching the ones that are
+        not cached concurrently.
+
+        Args:
+            hashes (list): transaction hashes
+            fetch (callable): returns the response for one hash
+            block_index_of (callable): returns the block index of a
+                response, None if it is not in a block
+            block_count (callable): returns the current block count
+            workers (int): maximum number of concurrent requests
+
+        Returns:
+            list: one response per hash, in the order of `hashes`. A
+            lookup that failed is returned as a `ValueError` instance.
+        """
+        found, missing = self._lookup(hashes)
+        if missing:
+            def call(hash):
+                try:
+                    return fetch(hash)
+                except ValueError as e:
+                    return e
+
+            count = block_count()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(call, missing))
+            self._store(found, missing, responses, count, block_index_of)
+        return [found[hash] for hash in hashes]
+
+    async def bulk_async(self, hashes, fetch, block_index_of, block_count,
+                         workers=8):
+        """
+        Like `bulk`, for the asyncio clients.
+
+        `fetch` and `block_count` are coroutine functions, at most
+        `workers` of the fetches run at the same time.
+        """
+        found, missing = self._lookup(hashes)
+        if missing:
+            semaphore = asyncio.Semaphore(workers)
+
+            async def call(hash):
+                async with semaphore:
+                    try:
+                        return await fetch(hash)
+                    except ValueError as e:
+                        return e
+
+            count = await block_count()
+            responses = await asyncio.gather(*[call(h) for h in missing])
+            self._store(found, missing, responses, count, block_index_of)
+        return [found[hash] for hash in hashes]
+
+    def _lookup(self, hashes):
+        found = {}
+        missing = []
+        for hash in dict.fromkeys(hashes):
+            response = self.backend.get(f'tx:{hash}')
+            if response is None:
+                missing.append(hash)
+            else:
+                found[hash] = response
+        with self._lock:
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(missing)
+        return found, missing
+
+    def _store(self, found, missing, responses, count, block_index_of):
+        for hash, response in zip(missing, responses):
+            found[hash] = response
+            if isinstance(response, ValueError):
+                continue
+            index = block_index_of(response)
+            if index is not None and count - index >= self.confirmations:
+                self.backend.set(f'tx:{hash}', response)
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,222 @@
+import json
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blocks (
+    block_index INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_hash TEXT PRIMARY KEY,
+    block_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    payment_id TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    fee INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    transaction_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    type INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_payment_id
+    ON transactions (payment_id);
+CREATE INDEX IF NOT EXISTS transactions_block_index
+    ON transactions (block_index);
+CREATE INDEX IF NOT EXISTS transactions_timestamp
+    ON transactions (timestamp);
+CREATE INDEX IF NOT EXISTS transfers_address
+    ON transfers (address, transaction_hash);
+CREATE INDEX IF NOT EXISTS transfers_transaction_hash
+    ON transfers (transaction_hash);
+'''
+
+
+class TransactionIndex:
+    """
+    Local sqlite index of the transactions of a `Walletd` wallet.
+
+    `sync` fetches only the blocks after the last indexed block, using
+    `get_block_hashes` to find the first block of every window. Before
+    syncing, the last indexed blocks are compared with the wallet's
+    block hashes and rolled back if they were replaced by a reorg.
+
+    Example::
+
+        index = TransactionIndex(Walletd(password='test'), 'wallet.db')
+        index.sync()
+        index.find(payment_id='7f3e...')
+
+    Args:
+        wallet (Walletd): the wallet to index
+        path (str): path of the sqlite database
+        addresses (list): (optional) addresses to index. Defaults to all
+            addresses of the wallet.
+        window (int): number of blocks fetched per request
+        reorg_depth (int): number of blocks checked for a reorg
+    """
+
+    def __init__(self, wallet, path, addresses=None, window=1000,
+                 reorg_depth=60):
+        self.wallet = wallet
+        self.addresses = addresses or []
+        self.window = window
+        self.reorg_depth = reorg_depth
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    @property
+    def last_block_index(self):
+        """
+        Index of the last indexed block or -1 if nothing is indexed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(block_index) FROM blocks').fetchone()
+        return -1 if row[0] is None else row[0]
+
+    def sync(self):
+        """
+        Indexes all blocks the wallet knows about that are not indexed yet.
+
+        Returns:
+            int: number of new transactions
+        """
+        self._rollback_reorg()
+        block_count = self.wallet.get_status()['result']['blockCount']
+        first = self.last_block_index + 1
+        added = 0
+        while first < block_count:
+            count = min(self.window, block_count - first)
+            hashes = self.wallet.get_block_hashes(first, count)
+            hashes = hashes['result']['blockHashes']
+            if not hashes:
+                break
+            response = self.wallet.get_transactions(
+                self.addresses, hashes[0], len(hashes), '')
+            added += self._insert(first, hashes, response['result']['items'])
+            first += len(hashes)
+        return added
+
+    def get(self, transaction_hash):
+        """
+        Returns an indexed transaction in the format of
+        `Walletd.get_transaction` or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM transactions WHERE transaction_hash = ?',
+                (transaction_hash,)).fetchone()
+        return None if row is None else json.loads(row['data'])
+
+    def find(self, payment_id=None, address=None, first_block_index=None,
+             last_block_index=None, since=None, until=None):
+        """
+        Returns the indexed transactions matching all given filters,
+        ordered by block index.
+
+        Args:
+            payment_id (str): payment id of the transaction
+            address (str): address of one of the transfers
+            first_block_index (int): lowest block index
+            last_block_index (int): highest block index
+            since (int): lowest timestamp
+            until (int): highest timestamp
+
+        Returns:
+            list: transactions in the format of `Walletd.get_transaction`
+        """
+        query = 'SELECT DISTINCT t.data, t.block_index FROM transactions t'
+        where = []
+        args = []
+        if address is not None:
+            query += (' JOIN transfers r'
+                      ' ON r.transaction_hash = t.transaction_hash')
+            where.append('r.address = ?')
+            args.append(address)
+        if payment_id is not None:
+            where.append('t.payment_id = ?')
+            args.append(payment_id)
+        if first_block_index is not None:
+            where.append('t.block_index >= ?')
+            args.append(first_block_index)
+        if last_block_index is not None:
+            where.append('t.block_index <= ?')
+            args.append(last_block_index)
+        if since is not None:
+            where.append('t.timestamp >= ?')
+            args.append(since)
+        if until is not None:
+            where.append('t.timestamp <= ?')
+            args.append(until)
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY t.block_index'
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def _insert(self, first, hashes, items):
+        transactions = []
+        transfers = []
+        for item in items:
+            for tx in item['transactions']:
+                transactions.append((tx['transactionHash'], tx['blockIndex'],
+                                     tx['timestamp'], tx['paymentId'],
+                                     tx['amount'], tx['fee'],
+                                     json.dumps(tx)))
+                transfers.extend((tx['transactionHash'], t['address'],
+                                  t['amount'], t['type'])
+                                 for t in tx['transfers'])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO blocks VALUES (?, ?)',
+                enumerate(hashes, first))
+            self._conn.executemany(
+                'DELETE FROM transfers WHERE transaction_hash = ?',
+                [(t[0],) for t in transactions])
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO transactions VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)', transactions)
+            self._conn.executemany(
+                'INSERT INTO transfers VALUES (?, ?, ?, ?)', transfers)
+        return len(transactions)
+
+    def _rollback_reorg(self):
+        last = self.last_block_index
+        if last < 0:
+            return
+        first = max(last - self.reorg_depth + 1, 0)
+        response = self.wallet.get_block_hashes(first, last - first + 1)
+        actual = response['result']['blockHashes']
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT block_index, block_hash FROM blocks '
+                'WHERE block_index >= ? ORDER BY block_index',
+                (first,)).fetchall()
+        fork = None
+        for row in rows:
+            i = row['block_index'] - first
+            if i >= len(actual) or actual[i] != row['block_hash']:
+                fork = row['block_index']
+                break
+        if fork is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM transfers WHERE transaction_hash IN '
+                '(SELECT transaction_hash FROM transactions '
+                'WHERE block_index >= ?)', (fork,))
+            self._conn.execute(
+                'DELETE FROM transactions WHERE block_index >= ?', (fork,))
+            self._conn.execute(
+                'DELETE FROM blocks WHERE block_index >= ?', (fork,))
@@ -2,6 +2,8 @@ import random
 import string
 import binascii
 
+from .amount import Amount
+
 
 def generate_payment_id():
     """
@@ -14,7 +16,8 @@ def format_amount(amount):
     """
     Format amount into user-friendly format
 
-    For example 1000 will be 10.00
+    For example 1000 will be 10.00. Use `str(Amount(amount))` for an
+    exact string.
     """
     return float(amount/100)
 
@@ -23,9 +26,11 @@ def parse_amount(amount):
     """
     Format amount from user-friendly format to internal representation
 
-    For example 10.00 will be 1000
+    For example 10.00 will be 1000. Strings and Decimals are parsed
+    exactly and may have at most two decimals, floats are rounded to the
+    nearest atomic unit (0.29 is 29).
     """
-    return int(amount*100)
+    return int(Amount.parse(amount))
 
 
 def convert_bytes_to_hex_str(data):
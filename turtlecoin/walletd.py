@@ -1,23 +1,43 @@
-import json
-import logging
-import requests
-
+from .client import JSONRPCClient
+from .txcache import TransactionCache
 from .utils import convert_bytes_to_hex_str
 
 
-class Walletd:
+def _transaction_block_index(response):
+    return response['result']['transaction']['blockIndex']
+
+
+class Walletd(JSONRPCClient):
     """
     Integrates with Walletd RPC interface.
 
     Run Walletd like this::
 
         $ walletd -w test.wallet -p mypw --local --rpc-password test
+
+    All requests go through a pooled keep-alive HTTP session. Pass
+    `session` (see :func:`turtlecoin.create_session`) to share one
+    connection pool between several clients, or a
+    :class:`~turtlecoin.transport.SocketSession` for lower per-request
+    overhead.
+
+    `get_transactions_bulk` keeps deeply confirmed transactions in
+    `transaction_cache` (see :class:`turtlecoin.txcache.TransactionCache`).
     """
 
-    def __init__(self, password, host='127.0.0.1', port=8070):
-        self.url = f'http://{host}:{port}/json_rpc'
-        self.headers = {'content-type': 'application/json'}
+    def __init__(self, password, host='127.0.0.1', port=8070, session=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 codec=None, coalesce=False, ttl=None,
+                 transaction_cache=None):
+        super().__init__(f'http://{host}:{port}/json_rpc', session=session,
+                         pool_connections=pool_connections,
+                         pool_maxsize=pool_maxsize,
+                         pool_block=pool_block, codec=codec,
+                         coalesce=coalesce, ttl=ttl)
         self.password = password
+        if transaction_cache is None:
+            transaction_cache = TransactionCache()
+        self.transaction_cache = transaction_cache
 
     def _make_request(self, method, **kwargs):
         payload = {
@@ -27,13 +47,7 @@ class Walletd:
             'id': 0,
             'params': kwargs
         }
-        logging.debug(json.dumps(payload, indent=4))
-        response = requests.post(self.url,
-                                 data=json.dumps(payload),
-                                 headers=self.headers).json()
-        if 'error' in response:
-            raise ValueError(response['error'])
-        return response
+        return self._post(self.url, payload)
 
     def reset(self, view_secret_key):
         """
@@ -84,7 +98,9 @@ class Walletd:
         return r
 
     def get_status(self):
-        return self._make_request('getStatus')
+        return self._coalesced('getStatus',
+                               lambda: self._make_request('getStatus'),
+                               lambda r: r['result']['blockCount'])
 
     def get_addresses(self):
         return self._make_request('getAddresses')
@@ -203,6 +219,25 @@ class Walletd:
         r = self._make_request('getTransaction', **params)
         return r
 
+    def get_transactions_bulk(self, hashes, workers=8):
+        """
+        Returns many transactions, see `get_transaction`
+
+        Transactions found in `transaction_cache` are not requested again,
+        the others are fetched with up to `workers` concurrent requests.
+
+        Args:
+            hashes (list): transaction hashes
+            workers (int): maximum number of concurrent requests
+
+        Returns:
+            list: one response per hash, in the order of `hashes`. A
+            lookup that failed is returned as a `ValueError` instance.
+        """
+        return self.transaction_cache.bulk(
+            hashes, self.get_transaction, _transaction_block_index,
+            lambda: self.get_status()['result']['blockCount'], workers)
+
     def get_transactions(self, addresses, block_hash, block_count,
                          payment_id):
         params = {'addresses': addresses,